@@ -0,0 +1,202 @@
+from functools import wraps
+from math import ceil
+
+from django.db import IntegrityError
+from django.db.models import F
+from django.forms import ModelChoiceField
+from django.http import HttpResponse
+from rest_framework import status
+from rest_framework.exceptions import (APIException, MethodNotAllowed,
+                                       NotAuthenticated, NotFound,
+                                       ValidationError)
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.parsers import JSONParser
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+from api.authentication import CachedTokenAuthentication
+from api.errors import err_already_in_cart, err_not_in_cart
+from api.fast_serializers import CategoryFastSerializer, ProductFastSerializer
+from api.pagination import CategoryPagination, ProductPagination
+from api.renderers import FastJSONRenderer
+from api.serializers import CartObjectSerializer
+from api.views import get_cart_queryset, serialize_cart
+from products.models import CartObject, Category, Product, ProductListing
+from products.search import search_products
+
+renderer = FastJSONRenderer()
+authentication = CachedTokenAuthentication()
+
+
+def json_response(data=None, status=status.HTTP_200_OK, headers=None):
+    return HttpResponse(renderer.render(data), status=status,
+                        content_type=renderer.media_type, headers=headers)
+
+
+def error_response(error):
+    return json_response(error.get_errors_context(), error.status)
+
+
+def async_api_view(methods, authenticated=False):
+    """Асинхронный аналог api_view для представлений этого модуля.
+
+    Аутентифицирует запрос по токену и превращает исключения DRF в
+    такие же ответы, как у синхронных представлений.
+    """
+    def decorator(view_func):
+        @wraps(view_func)
+        async def wrapper(request, *args, **kwargs):
+            try:
+                if request.method not in methods:
+                    raise MethodNotAllowed(request.method)
+                result = await authentication.aauthenticate(request)
+                if result is not None:
+                    request.user, request.auth = result
+                elif authenticated:
+                    raise NotAuthenticated
+                return await view_func(request, *args, **kwargs)
+            except APIException as exc:
+                headers = {}
+                if exc.status_code == status.HTTP_401_UNAUTHORIZED:
+                    headers['WWW-Authenticate'] = (
+                        authentication.authenticate_header(request))
+                if exc.status_code == status.HTTP_405_METHOD_NOT_ALLOWED:
+                    headers['Allow'] = ', '.join(methods)
+                detail = exc.detail
+                if not isinstance(detail, (list, dict)):
+                    detail = {'detail': detail}
+                return json_response(detail, exc.status_code, headers)
+        # csrf_exempt в Django 4.2 превращает корутину в синхронную функцию.
+        wrapper.csrf_exempt = True
+        return wrapper
+    return decorator
+
+
+async def paginate(request, queryset, page_size):
+    try:
+        number = int(request.GET.get('page', 1))
+    except ValueError:
+        number = 0
+    count = await queryset.acount()
+    if number < 1 or number > max(ceil(count / page_size), 1):
+        raise NotFound(PageNumberPagination.invalid_page_message)
+    offset = (number - 1) * page_size
+    rows = [row async for row in queryset[offset:offset + page_size]]
+    url = request.build_absolute_uri()
+    next_link = previous_link = None
+    if offset + page_size < count:
+        next_link = replace_query_param(url, 'page', number + 1)
+    if number == 2:
+        previous_link = remove_query_param(url, 'page')
+    elif number > 2:
+        previous_link = replace_query_param(url, 'page', number - 1)
+    return count, next_link, previous_link, rows
+
+
+async def paginated_response(request, queryset, serializer_class, page_size):
+    count, next_link, previous_link, rows = await paginate(
+        request, queryset, page_size)
+    serializer = serializer_class(rows, many=True,
+                                  context={'request': request})
+    return serializer, {'count': count, 'next': next_link,
+                        'previous': previous_link}
+
+
+@async_api_view(['GET'])
+async def categories_view(request):
+    serializer, page = await paginated_response(
+        request, CategoryFastSerializer.get_values(Category.objects.all()),
+        CategoryFastSerializer, CategoryPagination.page_size)
+    serializer.set_subcategories(
+        [row async for row in serializer.get_subcategory_values()])
+    return json_response({**page, 'results': serializer.data})
+
+
+async def filter_products(request, queryset):
+    errors = {}
+    for field in ('subcategory', 'category'):
+        value = request.GET.get(field)
+        if not value:
+            continue
+        model = ProductListing._meta.get_field(field).related_model
+        if not (value.isdigit()
+                and await model.objects.filter(pk=value).aexists()):
+            errors[field] = [
+                ModelChoiceField.default_error_messages['invalid_choice']]
+            continue
+        queryset = queryset.filter(**{f'{field}_id': value})
+    if errors:
+        raise ValidationError(errors)
+    query = ' '.join(request.GET.get('search', '').replace(
+        '\x00', '').replace(',', ' ').split())
+    if query:
+        queryset = search_products(queryset, query)
+    return queryset
+
+
+@async_api_view(['GET'])
+async def products_view(request):
+    queryset = await filter_products(request, ProductListing.objects.all())
+    serializer, page = await paginated_response(
+        request, ProductFastSerializer.get_values(queryset),
+        ProductFastSerializer, ProductPagination.page_size)
+    return json_response({**page, 'results': serializer.data})
+
+
+@async_api_view(['GET'])
+async def product_view(request, pk):
+    row = await ProductFastSerializer.get_values(
+        ProductListing.objects.filter(pk=pk)).afirst()
+    if row is None:
+        raise NotFound
+    return json_response(ProductFastSerializer(
+        row, context={'request': request}).data)
+
+
+async def get_product_or_404(product_id):
+    if not await Product.objects.filter(pk=product_id).aexists():
+        raise NotFound
+
+
+@async_api_view(['POST', 'PATCH', 'DELETE'], authenticated=True)
+async def shopping_cart_detail(request, pk):
+    cart = CartObject.objects.filter(user=request.user, product=pk)
+    match request.method:
+        case 'POST':
+            try:
+                await CartObject.objects.acreate(user=request.user,
+                                                 product_id=pk)
+            except IntegrityError:
+                await get_product_or_404(pk)
+                return error_response(err_already_in_cart)
+            return json_response(status=status.HTTP_201_CREATED)
+        case 'PATCH':
+            data = JSONParser().parse(request) if request.body else {}
+            serializer = CartObjectSerializer(data=data, partial=True)
+            if not serializer.is_valid():
+                await get_product_or_404(pk)
+                if not await cart.aexists():
+                    return error_response(err_not_in_cart)
+                raise ValidationError(serializer.errors)
+            amount = serializer.validated_data.get('amount', F('amount'))
+            if await cart.aupdate(amount=amount):
+                return json_response(status=status.HTTP_200_OK)
+            await get_product_or_404(pk)
+            return error_response(err_not_in_cart)
+        case 'DELETE':
+            deleted, _ = await cart.adelete()
+            if deleted:
+                return json_response(status=status.HTTP_204_NO_CONTENT)
+            await get_product_or_404(pk)
+            return error_response(err_not_in_cart)
+
+
+@async_api_view(['GET', 'DELETE'], authenticated=True)
+async def shopping_cart_view(request):
+    match request.method:
+        case 'GET':
+            return json_response(serialize_cart(
+                [cart_object async for cart_object
+                 in get_cart_queryset(request.user)]))
+        case 'DELETE':
+            await request.user.cart_of.all().adelete()
+            return json_response(status=status.HTTP_204_NO_CONTENT)
@@ -0,0 +1,111 @@
+import threading
+import time
+from collections import OrderedDict
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from rest_framework.authentication import TokenAuthentication
+
+
+class TokenCache:
+    """Потокобезопасный LRU-кеш токенов с ограниченным временем жизни.
+
+    Хранит неизменяемые данные (значения полей), а не модели: объекты
+    пользователя и токена для каждого запроса создаются заново.
+
+    Кеш свой у каждого процесса, поэтому сброс записи по сигналу виден
+    только в процессе, где изменились данные; в остальных запись живёт
+    не дольше ttl секунд.
+    """
+
+    def __init__(self, maxsize, ttl):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, user_id, data = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return data
+
+    def set(self, key, user_id, data):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, user_id, data)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def delete_user(self, user_id):
+        with self._lock:
+            for key in [key for key, (_, entry_user_id, _) in
+                        self._entries.items() if entry_user_id == user_id]:
+                del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+token_cache = TokenCache(settings.AUTH_TOKEN_CACHE_SIZE,
+                         settings.AUTH_TOKEN_CACHE_TTL)
+
+
+class TokenKeyAuthentication(TokenAuthentication):
+    """Только разбор заголовка Authorization: authenticate возвращает
+    ключ токена."""
+
+    def authenticate_credentials(self, key):
+        return key
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    token_fields = ('key', 'user_id', 'created')
+
+    def get_user_fields(self):
+        return [field.attname
+                for field in get_user_model()._meta.concrete_fields]
+
+    def get_cached_credentials(self, key):
+        data = token_cache.get(key)
+        if data is None:
+            return None
+        db, token_values, user_values = data
+        user = get_user_model().from_db(db, self.get_user_fields(),
+                                        user_values)
+        token = self.get_model().from_db(db, self.token_fields, token_values)
+        token.user = user
+        return user, token
+
+    def authenticate_credentials(self, key):
+        credentials = self.get_cached_credentials(key)
+        if credentials is None:
+            user, token = super().authenticate_credentials(key)
+            token_cache.set(key, user.pk, (
+                token._state.db,
+                tuple(getattr(token, name) for name in self.token_fields),
+                tuple(getattr(user, name)
+                      for name in self.get_user_fields())))
+            return user, token
+        return credentials
+
+    async def aauthenticate(self, request):
+        """Асинхронный вариант authenticate для async-представлений:
+        токен из кеша — без потока, иначе синхронный путь в потоке."""
+        key = TokenKeyAuthentication().authenticate(request)
+        if key is None:
+            return None
+        return (self.get_cached_credentials(key)
+                or await sync_to_async(self.authenticate_credentials)(key))
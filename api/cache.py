@@ -0,0 +1,48 @@
+from functools import wraps
+from hashlib import md5
+
+from django.core.cache import caches
+from rest_framework import status
+from rest_framework.response import Response
+
+from store.cache_versions import bump_version, get_version
+
+CATALOG_CACHE = 'catalog'
+CATALOG_VERSION_KEY = 'catalog:version'
+
+
+def get_catalog_version(cache):
+    return get_version(cache, CATALOG_VERSION_KEY)
+
+
+def get_request_catalog_version(cache, request):
+    """Версия каталога, прочитанная один раз за запрос: по ней строятся
+    и ETag, и ключ кеша ответа."""
+    if not hasattr(request, 'catalog_version'):
+        request.catalog_version = get_catalog_version(cache)
+    return request.catalog_version
+
+
+def invalidate_catalog():
+    bump_version(caches[CATALOG_CACHE], CATALOG_VERSION_KEY)
+
+
+def catalog_cache_key(cache, request):
+    uri = md5(request.build_absolute_uri().encode()).hexdigest()
+    version = get_request_catalog_version(cache, request)
+    return f'catalog:{version}:{uri}'
+
+
+def cache_catalog_response(view):
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        cache = caches[CATALOG_CACHE]
+        key = catalog_cache_key(cache, request)
+        data = cache.get(key)
+        if data is not None:
+            return Response(data)
+        response = view(request, *args, **kwargs)
+        if response.status_code == status.HTTP_200_OK:
+            cache.set(key, response.data)
+        return response
+    return wrapper
@@ -0,0 +1,43 @@
+from functools import wraps
+from hashlib import sha1
+
+from django.core.cache import caches
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+from rest_framework import status
+
+from api.cache import CATALOG_CACHE, get_request_catalog_version
+from store.cache_versions import get_version_timestamp
+
+
+def get_catalog_etag(request, version):
+    # Тип ответа входит в ETag: JSON и страница браузируемого API —
+    # разные представления одного адреса.
+    return quote_etag(sha1(
+        f'{version}:{request.accepted_media_type}:'
+        f'{request.build_absolute_uri()}'.encode()).hexdigest())
+
+
+def conditional_catalog_response(view_func):
+    """Отдаёт 304 по If-None-Match или If-Modified-Since без обращения к
+    базе и сериализации.
+
+    ETag строится из версии каталога, типа ответа и адреса запроса,
+    Last-Modified — время смены версии: версия меняется при любом
+    изменении каталога (api.signals).
+    """
+    @wraps(view_func)
+    def wrapper(request, *args, **kwargs):
+        version = get_request_catalog_version(caches[CATALOG_CACHE], request)
+        etag = get_catalog_etag(request, version)
+        last_modified = get_version_timestamp(version)
+        response = get_conditional_response(
+            request, etag=etag, last_modified=last_modified)
+        if response is None:
+            response = view_func(request, *args, **kwargs)
+        if response.status_code in (status.HTTP_200_OK,
+                                    status.HTTP_304_NOT_MODIFIED):
+            response['ETag'] = etag
+            response['Last-Modified'] = http_date(last_modified)
+        return response
+    return wrapper
@@ -2,12 +2,15 @@ from dataclasses import dataclass
 
 from drf_yasg import openapi
 from rest_framework import status
-from rest_framework.exceptions import NotAuthenticated, NotFound
+from rest_framework.exceptions import (NotAuthenticated, NotFound,
+                                       PermissionDenied)
 from rest_framework.response import Response
 
 messages = {'already_in_cart': 'Этот продукт уже есть в корзине',
             'not_in_cart': 'Этого продукта нет в корзине',
-            'not_less_1': 'Количество не может быть меньше 1'}
+            'not_less_1': 'Количество не может быть меньше 1',
+            'invalid_since': ('Неверный формат даты и времени, '
+                              'используйте ISO 8601')}
 
 
 @dataclass
@@ -40,6 +43,11 @@ err_401_unauthorized = ErrorMessage(status=status.HTTP_401_UNAUTHORIZED,
                                     key='detail',
                                     message=NotAuthenticated.default_detail)
 
+err_403_forbidden = ErrorMessage(status=status.HTTP_403_FORBIDDEN,
+                                 key='detail',
+                                 message=PermissionDenied.default_detail)
+
 err_dict_404_not_found = err_dict(err_404_not_found, 'Объект не найден')
 err_dict_401_unauthorized = err_dict(err_401_unauthorized,
                                      'Пользователь не авторизован')
+err_dict_403_forbidden = err_dict(err_403_forbidden, 'Недостаточно прав')
@@ -0,0 +1,173 @@
+from abc import ABC, abstractmethod
+from operator import itemgetter
+
+from api.serializers import CustomDecimalField
+from products.models import Category, ProductListing, Subcategory
+from products.thumbnails import get_variant_urls
+from store.instrumentation import timed
+
+
+class AbsoluteURI:
+    """build_absolute_uri с вычисленным один раз на запрос префиксом.
+
+    Ссылки хранилища уже экранированы, поэтому путь от корня достаточно
+    склеить с префиксом; остальные ссылки уходят в build_absolute_uri.
+    """
+    def __init__(self, request):
+        self.request = request
+        self.prefix = request.build_absolute_uri('/')[:-1]
+
+    def __call__(self, url):
+        if (url.startswith('/') and not url.startswith('//')
+                and '/./' not in url and '/../' not in url):
+            return self.prefix + url
+        return self.request.build_absolute_uri(url)
+
+
+class FastSerializer(ABC):
+    """Сериализатор только для чтения, работающий со строками .values().
+
+    Повторяет вывод обычного сериализатора, но вместо полей DRF вызывает
+    заранее собранные функции доступа к значениям строки.
+    """
+    value_fields = ()
+
+    def __init__(self, instance=None, many=False, context=None, **kwargs):
+        self.instance = instance
+        self.many = many
+        self.context = context or {}
+        self.absolute_uri = AbsoluteURI(self.context['request'])
+        self.accessors = tuple(self.get_accessors())
+
+    @classmethod
+    def get_values(cls, queryset):
+        return queryset.prefetch_related(None).values(*cls.value_fields)
+
+    @abstractmethod
+    def get_accessors(self):
+        """Пары (поле ответа, функция, получающая значение из строки)."""
+
+    def to_representation(self, row):
+        return {name: accessor(row) for name, accessor in self.accessors}
+
+    @property
+    @timed('serialize')
+    def data(self):
+        if self.many:
+            return [self.to_representation(row) for row in self.instance]
+        return self.to_representation(self.instance)
+
+    def image_url(self, storage):
+        absolute_uri = self.absolute_uri
+
+        def accessor(name):
+            return absolute_uri(storage.url(name)) if name else None
+        return accessor
+
+
+class ProductFastSerializer(FastSerializer):
+    value_fields = ('id', 'name', 'slug', 'subcategory_name', 'price',
+                    'category_name', 'image', 'thumbnails', 'category_id',
+                    'subcategory_id')
+
+    def get_accessors(self):
+        price = CustomDecimalField().to_representation
+        storage = ProductListing._meta.get_field('image').storage
+        absolute_uri = self.absolute_uri
+        get_price = itemgetter('price')
+        get_images = itemgetter('thumbnails', 'image')
+
+        def images(row):
+            thumbnails, image = get_images(row)
+            return [absolute_uri(url)
+                    for url in get_variant_urls(thumbnails, image, storage)]
+
+        return (
+            ('id', itemgetter('id')),
+            ('name', itemgetter('name')),
+            ('slug', itemgetter('slug')),
+            ('subcategory', itemgetter('subcategory_name')),
+            ('price', lambda row: price(get_price(row))),
+            ('category', itemgetter('category_name')),
+            ('images', images),
+        )
+
+
+class SubcategoryFastSerializer(FastSerializer):
+    value_fields = ('id', 'name', 'slug', 'image', 'category_id')
+
+    def get_accessors(self):
+        image = self.image_url(Subcategory._meta.get_field('image').storage)
+        get_image = itemgetter('image')
+        return (
+            ('id', itemgetter('id')),
+            ('name', itemgetter('name')),
+            ('slug', itemgetter('slug')),
+            ('image', lambda row: image(get_image(row))),
+        )
+
+
+class CategoryFastSerializer(FastSerializer):
+    value_fields = ('id', 'name', 'slug', 'image')
+    subcategory_serializer_class = SubcategoryFastSerializer
+
+    def get_accessors(self):
+        image = self.image_url(Category._meta.get_field('image').storage)
+        get_image = itemgetter('image')
+        return (
+            ('id', itemgetter('id')),
+            ('name', itemgetter('name')),
+            ('slug', itemgetter('slug')),
+            ('subcategories', self.get_subcategories),
+            ('image', lambda row: image(get_image(row))),
+        )
+
+    subcategories = None
+
+    def get_subcategories(self, row):
+        return self.subcategories.get(row['id'], [])
+
+    def get_subcategory_values(self):
+        rows = self.instance if self.many else [self.instance]
+        return self.subcategory_serializer_class.get_values(
+            Subcategory.objects.filter(
+                category_id__in=[row['id'] for row in rows]))
+
+    def set_subcategories(self, subcategory_rows):
+        serializer = self.subcategory_serializer_class(context=self.context)
+        self.subcategories = {}
+        for subcategory in subcategory_rows:
+            self.subcategories.setdefault(
+                subcategory['category_id'], []).append(
+                    serializer.to_representation(subcategory))
+
+    @property
+    @timed('serialize')
+    def data(self):
+        if self.subcategories is None:
+            self.set_subcategories(self.get_subcategory_values())
+        return super().data
+
+
+class FastSerializerMixin:
+    """Отдаёт GET-запросы через fast_serializer_class.
+
+    Схема API и формы browsable API по-прежнему строятся по
+    serializer_class.
+    """
+    fast_serializer_class = None
+
+    def use_fast_serializer(self):
+        return (not getattr(self, 'swagger_fake_view', False)
+                and self.request.method in ('GET', 'HEAD'))
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.use_fast_serializer():
+            return self.fast_serializer_class.get_values(queryset)
+        return queryset
+
+    def get_serializer_class(self):
+        if self.use_fast_serializer():
+            return self.fast_serializer_class
+        return super().get_serializer_class()
@@ -0,0 +1,11 @@
+from rest_framework.filters import SearchFilter
+
+from products.search import search_products
+
+
+class ProductSearchFilter(SearchFilter):
+    def filter_queryset(self, request, queryset, view):
+        query = ' '.join(self.get_search_terms(request))
+        if not query:
+            return queryset
+        return search_products(queryset, query)
@@ -0,0 +1,244 @@
+import math
+import random
+import statistics
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.core.management.base import BaseCommand, CommandError
+from django.db import router, transaction
+from django.test import Client
+from rest_framework.authtoken.models import Token
+
+from api.cache import CATALOG_CACHE
+from api.pagination import CategoryPagination, ProductPagination
+from api.query_budget import query_budget
+from products.models import CartObject, Category, ProductListing
+
+User = get_user_model()
+SEARCH_QUERIES = ('сыр', 'молоко прост', 'green', 'творог фермерский',
+                  'йогурт')
+PASSWORD = 'Vq7-lodka-Mx2'
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = ('Нагрузочный замер всех адресов api/ внутри процесса, без '
+            'сети: перцентили задержки, число SQL-запросов на запрос и '
+            'пропускная способность. Все изменения в базе откатываются.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200,
+                            help='Количество запросов к каждому адресу')
+        parser.add_argument('--warmup', type=int, default=10,
+                            help='Количество прогревочных GET-запросов')
+        parser.add_argument('--cart-size', type=int, default=10,
+                            help='Количество продуктов в корзине')
+        parser.add_argument('--max-page', type=int, default=100,
+                            help='Наибольший запрашиваемый номер страницы')
+        parser.add_argument('--cold', action='store_true',
+                            help='Очищать кеш каталога перед каждым запросом')
+        parser.add_argument('--only', nargs='+', default=(),
+                            help='Замерять только адреса, содержащие '
+                                 'одну из этих строк')
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        self.rng = random.Random(options['seed'])
+        self.options = options
+        self.client = Client(SERVER_NAME=settings.ALLOWED_HOSTS[0])
+        product_ids = list(ProductListing.objects.values_list('id',
+                                                              flat=True))
+        needed = options['cart_size'] + options['requests'] * 5
+        if len(product_ids) < needed:
+            raise CommandError(
+                f'Нужно хотя бы {needed} продуктов, в базе '
+                f'{len(product_ids)}. Создайте их командой generate_catalog.')
+        self.stdout.write(
+            f'{"адрес":<48}{"запросов":>9}{"p50, мс":>9}{"p95, мс":>9}'
+            f'{"p99, мс":>9}{"SQL":>6}{"запр/с":>9}{"ошибок":>8}')
+        try:
+            with transaction.atomic(using=router.db_for_write(CartObject)):
+                self.prepare(self.rng.sample(product_ids, needed))
+                for scenario in self.get_scenarios():
+                    if any(part in scenario['name']
+                           for part in options['only']) or not (
+                               options['only']):
+                        self.run(scenario)
+                raise Rollback
+        except Rollback:
+            pass
+
+    def prepare(self, product_ids):
+        """Создаёт пользователей для замера и заполняет корзину."""
+        cart_size = self.options['cart_size']
+        self.cart_ids = product_ids[:cart_size]
+        # Продукты не из корзины: по пять на каждую итерацию.
+        self.free_ids = product_ids[cart_size:]
+        self.user = User.objects.create_user(
+            username='benchmark-api', email='benchmark-api@example.com',
+            password=PASSWORD, is_staff=True)
+        self.token = Token.objects.create(user=self.user).key
+        self.other_user = User.objects.create_user(
+            username='benchmark-api-logout',
+            email='benchmark-api-logout@example.com', password=PASSWORD)
+        self.fill_cart()
+        self.product_pages = min(self.options['max_page'], max(1, math.ceil(
+            ProductListing.objects.count() / ProductPagination.page_size)))
+        self.category_pages = max(1, math.ceil(
+            Category.objects.count() / CategoryPagination.page_size))
+        self.category_ids = list(Category.objects.values_list('id',
+                                                              flat=True))
+        self.subcategory_ids = list(ProductListing.objects.filter(
+            id__in=self.free_ids).values_list('subcategory_id', flat=True))
+
+    def fill_cart(self, iteration=None):
+        CartObject.objects.bulk_create(
+            (CartObject(user=self.user, product_id=product_id)
+             for product_id in self.cart_ids), ignore_conflicts=True)
+
+    def refresh_logout_token(self, iteration):
+        self.logout_token = Token.objects.get_or_create(
+            user=self.other_user)[0].key
+
+    def random_product(self, iteration):
+        return self.rng.choice(self.free_ids)
+
+    def free_product(self, iteration):
+        return self.free_ids[iteration]
+
+    def batch_operations(self, iteration):
+        # Чётные итерации добавляют пять продуктов, нечётные их удаляют.
+        start = iteration // 2 * 5
+        op = 'remove' if iteration % 2 else 'add'
+        return [{'product_id': product_id, 'op': op}
+                for product_id in self.free_ids[start:start + 5]]
+
+    def get_scenarios(self):
+        rng = self.rng
+        scenarios = [
+            {'name': 'GET /api/'},
+            {'name': 'GET /api/categories/',
+             'path': lambda i: f'/api/categories/?page='
+                               f'{rng.randint(1, self.category_pages)}'},
+            {'name': 'GET /api/products/',
+             'path': lambda i: f'/api/products/?page='
+                               f'{rng.randint(1, self.product_pages)}'},
+            {'name': 'GET /api/products/?cursor=',
+             'path': lambda i: '/api/products/?cursor='},
+            {'name': 'GET /api/products/?category=',
+             'path': lambda i: f'/api/products/?category='
+                               f'{rng.choice(self.category_ids)}'},
+            {'name': 'GET /api/products/?subcategory=',
+             'path': lambda i: f'/api/products/?subcategory='
+                               f'{rng.choice(self.subcategory_ids)}'},
+            {'name': 'GET /api/products/?search=',
+             'path': lambda i: f'/api/products/?search='
+                               f'{rng.choice(SEARCH_QUERIES)}'},
+            {'name': 'GET /api/products/{id}/',
+             'path': lambda i: f'/api/products/{self.random_product(i)}/'},
+            {'name': 'GET /api/shopping_cart/', 'auth': True},
+            {'name': 'GET /api/users/me/', 'auth': True},
+            {'name': 'GET /api/stats/db_pool/', 'auth': True},
+            {'name': 'GET /api/async/categories/',
+             'path': lambda i: f'/api/async/categories/?page='
+                               f'{rng.randint(1, self.category_pages)}'},
+            {'name': 'GET /api/async/products/',
+             'path': lambda i: f'/api/async/products/?page='
+                               f'{rng.randint(1, self.product_pages)}'},
+            {'name': 'GET /api/async/products/{id}/',
+             'path': lambda i: f'/api/async/products/'
+                               f'{self.random_product(i)}/'},
+            {'name': 'GET /api/async/shopping_cart/', 'auth': True},
+        ]
+        # Каждая тройка добавляет, изменяет и удаляет одни и те же продукты.
+        for prefix in ('/api', '/api/async'):
+            for method, data, expected in (('POST', None, 201),
+                                           ('PATCH', {'amount': 2}, 200),
+                                           ('DELETE', None, 204)):
+                scenarios.append({
+                    'name': f'{method} {prefix}/products/{{id}}/'
+                            f'shopping_cart/',
+                    'method': method, 'auth': True, 'status': expected,
+                    'data': (lambda i, data=data: data),
+                    'path': lambda i, prefix=prefix: (
+                        f'{prefix}/products/{self.free_product(i)}/'
+                        f'shopping_cart/')})
+        scenarios += [
+            {'name': 'POST /api/shopping_cart/batch/', 'method': 'POST',
+             'auth': True, 'data': self.batch_operations},
+            {'name': 'DELETE /api/shopping_cart/', 'method': 'DELETE',
+             'auth': True, 'status': 204, 'setup': self.fill_cart},
+            {'name': 'DELETE /api/async/shopping_cart/', 'method': 'DELETE',
+             'auth': True, 'status': 204, 'setup': self.fill_cart},
+            {'name': 'POST /api/users/', 'method': 'POST', 'status': 201,
+             'data': lambda i: {'email': f'benchmark-api-{i}@example.com',
+                                'username': f'benchmark-api-{i}',
+                                'password': PASSWORD}},
+            {'name': 'POST /api/auth/token/login/', 'method': 'POST',
+             'data': lambda i: {'email': self.user.email,
+                                'password': PASSWORD}},
+            {'name': 'POST /api/auth/token/logout/', 'method': 'POST',
+             'status': 204, 'setup': self.refresh_logout_token,
+             'token': lambda: self.logout_token},
+        ]
+        for scenario in scenarios:
+            method, path = scenario['name'].split(' ', 1)
+            scenario.setdefault('method', method)
+            scenario.setdefault('path', lambda i, path=path: path)
+            scenario.setdefault('status', 200)
+            if scenario.get('auth'):
+                scenario.setdefault('token', lambda: self.token)
+        return scenarios
+
+    def request(self, scenario, iteration):
+        if scenario.get('setup'):
+            scenario['setup'](iteration)
+        if self.options['cold']:
+            caches[CATALOG_CACHE].clear()
+        headers = {}
+        if scenario.get('token'):
+            headers['HTTP_AUTHORIZATION'] = f'Token {scenario["token"]()}'
+        data = scenario['data'](iteration) if scenario.get('data') else None
+        with query_budget(math.inf) as budget:
+            start = time.perf_counter()
+            response = self.client.generic(
+                scenario['method'], scenario['path'](iteration),
+                b'' if data is None else self.encode(data),
+                content_type='application/json', **headers)
+            elapsed = time.perf_counter() - start
+        return elapsed, len(budget.queries), response.status_code
+
+    def encode(self, data):
+        return self.client._encode_json(data, 'application/json')
+
+    def run(self, scenario):
+        if scenario['method'] == 'GET':
+            for iteration in range(self.options['warmup']):
+                self.request(scenario, iteration)
+        timings = []
+        queries = []
+        statuses = Counter()
+        for iteration in range(self.options['requests']):
+            elapsed, count, status = self.request(scenario, iteration)
+            timings.append(elapsed)
+            queries.append(count)
+            statuses[status] += 1
+        percentiles = (statistics.quantiles(timings, n=100)
+                       if len(timings) > 1 else timings * 99)
+        errors = sum(count for status, count in statuses.items()
+                     if status != scenario['status'])
+        self.stdout.write(
+            f'{scenario["name"]:<48}{len(timings):>9}'
+            f'{percentiles[49] * 1000:>9.2f}{percentiles[94] * 1000:>9.2f}'
+            f'{percentiles[98] * 1000:>9.2f}'
+            f'{statistics.mean(queries):>6.1f}'
+            f'{len(timings) / sum(timings):>9.0f}{errors:>8}')
+        if errors:
+            self.stdout.write(self.style.WARNING(
+                f'  коды ответов: {dict(statuses)}'))
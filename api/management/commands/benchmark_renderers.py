@@ -0,0 +1,75 @@
+import statistics
+import time
+from collections import OrderedDict
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.renderers import JSONRenderer
+
+from api.renderers import FastJSONRenderer, orjson
+
+
+class Command(BaseCommand):
+    help = ('Сравнивает скорость JSONRenderer и FastJSONRenderer на ответах '
+            'списка продуктов и корзины')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=int, nargs='+',
+                            default=[5, 100, 1000],
+                            help='Количество продуктов в ответе')
+        parser.add_argument('--repeat', type=int, default=50,
+                            help='Сколько раз повторять каждый замер')
+
+    def handle(self, *args, **options):
+        if orjson is None:
+            self.stdout.write('orjson не установлен, FastJSONRenderer '
+                              'использует стандартный json')
+        self.stdout.write(f'{"ответ":<12}{"строк":>8}{"DRF, мкс":>12}'
+                          f'{"быстрый, мкс":>15}{"ускорение":>12}')
+        for size in options['sizes']:
+            for name, data in (('продукты', self.product_list(size)),
+                               ('корзина', self.cart(size))):
+                slow = self.measure(JSONRenderer(), data, options['repeat'])
+                fast = self.measure(FastJSONRenderer(), data,
+                                    options['repeat'])
+                self.stdout.write(
+                    f'{name:<12}{size:>8}{slow * 1e6:>12.1f}'
+                    f'{fast * 1e6:>15.1f}{slow / fast:>11.1f}x')
+
+    def product_list(self, size):
+        return OrderedDict([
+            ('count', size),
+            ('next', 'http://localhost/api/products/?page=2'),
+            ('previous', None),
+            ('results', [OrderedDict([
+                ('id', number),
+                ('name', f'Продукт {number}'),
+                ('slug', f'product-{number}'),
+                ('subcategory', 'Подкатегория'),
+                ('price', Decimal(number % 10000) / 100 + Decimal('0.01')),
+                ('category', 'Категория'),
+                ('images', [f'http://localhost/media/cache/{number}/{side}.jpg'
+                            for side in (128, 256, 512)]),
+            ]) for number in range(size)]),
+        ])
+
+    def cart(self, size):
+        products = [OrderedDict([
+            ('id', number),
+            ('name', f'Продукт {number}'),
+            ('amount', number % 5 + 1),
+            ('price', Decimal('123.45')),
+            ('total_price', Decimal('123.45') * (number % 5 + 1)),
+        ]) for number in range(size)]
+        return {'products': products,
+                'total': sum(product['total_price'] for product in products)}
+
+    def measure(self, renderer, data, repeat):
+        if JSONRenderer().render(data) != renderer.render(data):
+            raise CommandError('Вывод рендереров различается')
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            renderer.render(data)
+            timings.append(time.perf_counter() - start)
+        return statistics.median(timings)
@@ -0,0 +1,83 @@
+import statistics
+import time
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test import RequestFactory
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+
+from api.fast_serializers import ProductFastSerializer
+from api.serializers import ProductSerializer
+from products.models import ProductListing
+
+
+class Command(BaseCommand):
+    help = ('Сравнивает скорость сериализации списка продуктов через '
+            'ProductSerializer и ProductFastSerializer')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=int, nargs='+',
+                            default=[5, 100, 1000],
+                            help='Размеры страницы')
+        parser.add_argument('--repeat', type=int, default=20,
+                            help='Сколько раз повторять каждый замер')
+
+    def handle(self, *args, **options):
+        request = RequestFactory(SERVER_NAME=settings.ALLOWED_HOSTS[0]).get(
+            '/api/products/')
+        context = {'request': request}
+        self.stdout.write(f'{"строк":>8}{"DRF, мкс/строка":>18}'
+                          f'{"быстрый, мкс/строка":>22}{"ускорение":>12}')
+        for size in options['sizes']:
+            rows = self.make_rows(size)
+            instances = [ProductListing(**row) for row in rows]
+            slow = self.measure(
+                lambda: ProductSerializer(
+                    instances, many=True, context=context).data,
+                options['repeat'])
+            fast = self.measure(
+                lambda: ProductFastSerializer(
+                    rows, many=True, context=context).data,
+                options['repeat'])
+            renderer = JSONRenderer()
+            if renderer.render(ProductSerializer(
+                    instances, many=True, context=context).data) != (
+                    renderer.render(ProductFastSerializer(
+                        rows, many=True, context=context).data)):
+                raise CommandError('Вывод сериализаторов различается')
+            self.stdout.write(
+                f'{size:>8}{slow / size * 1e6:>18.2f}'
+                f'{fast / size * 1e6:>22.2f}{slow / fast:>11.1f}x')
+
+    def make_rows(self, size):
+        now = timezone.now()
+        rows = []
+        for number in range(size):
+            image = f'products/product-{number}.jpg'
+            rows.append({
+                'id': number + 1,
+                'name': f'Продукт {number}',
+                'slug': f'product-{number}',
+                'price': Decimal(number % 10000) / 100 + Decimal('0.01'),
+                'category_id': 1,
+                'category_name': 'Категория',
+                'subcategory_id': 1,
+                'subcategory_name': 'Подкатегория',
+                'image': image,
+                'thumbnails': {} if number % 2 else {
+                    'source': image,
+                    'sizes': {size: f'/media/cache/{number}/{size}.jpg'
+                              for size in settings.IMAGE_VARIANT_SIZES}},
+                'updated_at': now,
+            })
+        return rows
+
+    def measure(self, serialize, repeat):
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            serialize()
+            timings.append(time.perf_counter() - start)
+        return statistics.median(timings)
@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from store.openapi import (generate_schema, get_built_schema_name,
+                           get_schema_name, write_schema)
+
+
+class Command(BaseCommand):
+    help = ('Собирает схему OpenAPI в файл с хешем содержимого в имени, '
+            'его загружает документация redoc/. Запускается при каждом '
+            'развёртывании.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--check', action='store_true',
+                            help='Ничего не записывать, завершиться с '
+                                 'ошибкой, если собранная схема устарела')
+
+    def handle(self, *args, **options):
+        content = generate_schema()
+        name = get_schema_name(content)
+        if options['check']:
+            built = get_built_schema_name()
+            if built != name:
+                raise CommandError(
+                    f'Схема OpenAPI устарела: собрана {built or "не была"}, '
+                    f'по коду получается {name}. Выполните '
+                    f'build_openapi_schema.')
+            self.stdout.write(self.style.SUCCESS(f'Схема {name} актуальна'))
+            return
+        write_schema(content)
+        self.stdout.write(self.style.SUCCESS(
+            f'Схема записана в {name}, {len(content) // 1024} КБ'))
@@ -0,0 +1,136 @@
+import random
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections, router, transaction
+
+from api.pagination import ProductKeysetPagination, ProductPagination
+from api.views import get_cart_queryset
+from products.listing import rebuild_listings
+from products.models import (CartObject, Category, Product, ProductListing,
+                             Subcategory)
+from store.db.explain import explain
+
+User = get_user_model()
+BATCH_SIZE = 10000
+IMAGE = 'products/чай.jpg'
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = ('Проверяет по EXPLAIN, что списки продуктов и корзина '
+            'читаются поиском по индексам, без полного прохода таблиц и '
+            'индексов и сортировки. Данные удаляются после проверки.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--products', type=int, default=100000,
+                            help='Количество продуктов')
+        parser.add_argument('--categories', type=int, default=20,
+                            help='Количество категорий')
+        parser.add_argument('--subcategories', type=int, default=10,
+                            help='Количество подкатегорий в категории')
+        parser.add_argument('--users', type=int, default=1000,
+                            help='Количество пользователей с корзинами')
+        parser.add_argument('--cart-size', type=int, default=20,
+                            help='Количество продуктов в каждой корзине')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--verbose-plans', action='store_true',
+                            help='Выводить планы всех запросов')
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic(using=router.db_for_write(Product)):
+                self.populate(random.Random(options['seed']), **options)
+                failed = self.check_plans(options['verbose_plans'])
+                raise Rollback
+        except Rollback:
+            pass
+        if failed:
+            raise CommandError(f'Запросы без индекса: {", ".join(failed)}')
+        self.stdout.write(self.style.SUCCESS('Все запросы читают по индексам'))
+
+    def populate(self, rng, **options):
+        categories = Category.objects.bulk_create(
+            Category(name=f'explain-{number}', slug=f'explain-{number}',
+                     image=IMAGE)
+            for number in range(options['categories']))
+        subcategories = Subcategory.objects.bulk_create(
+            Subcategory(name=f'explain-{category.pk}-{number}',
+                        slug=f'explain-{category.pk}-{number}',
+                        category=category, image=IMAGE)
+            for category in categories
+            for number in range(options['subcategories']))
+        batch = []
+        for number in range(options['products']):
+            subcategory = rng.choice(subcategories)
+            batch.append(Product(
+                name=f'explain-{number}', slug=f'explain-{number}', price=1,
+                category_id=subcategory.category_id, subcategory=subcategory,
+                image=IMAGE))
+            if len(batch) == BATCH_SIZE:
+                Product.objects.bulk_create(batch)
+                batch = []
+        Product.objects.bulk_create(batch)
+        rebuild_listings()
+        users = User.objects.bulk_create(
+            User(username=f'explain-{number}',
+                 email=f'explain-{number}@example.com')
+            for number in range(options['users']))
+        product_ids = list(Product.objects.filter(
+            name__startswith='explain-').values_list('pk', flat=True))
+        CartObject.objects.bulk_create(
+            (CartObject(user=user, product_id=product_id)
+             for user in users
+             for product_id in rng.sample(
+                 product_ids, min(options['cart_size'], len(product_ids)))),
+            batch_size=BATCH_SIZE)
+        connection = connections[router.db_for_write(Product)]
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+        self.category = categories[len(categories) // 2]
+        self.subcategory = subcategories[len(subcategories) // 2]
+        self.user = users[len(users) // 2]
+
+    def get_querysets(self):
+        page_size = ProductPagination.page_size
+        keyset = ProductKeysetPagination()
+        keyset_size = keyset.page_size + 1
+        listings = ProductListing.objects.all()
+        filters = {
+            'без фильтра': {},
+            'по категории': {'category': self.category.pk},
+            'по подкатегории': {'subcategory': self.subcategory.pk},
+            'по категории и подкатегории': {
+                'category': self.subcategory.category_id,
+                'subcategory': self.subcategory.pk},
+        }
+        for title, lookups in filters.items():
+            filtered = listings.filter(**lookups)
+            yield f'продукты {title}', filtered[:page_size]
+            ordered = filtered.order_by(*keyset.ordering)
+            yield f'продукты {title}, курсор', ordered[:keyset_size]
+            # Страница из середины списка: условие «после курсора» должно
+            # стать поиском по индексу, а не проходом от начала индекса.
+            position = ordered.values_list(*keyset.ordering)[
+                ordered.count() // 2]
+            yield (f'продукты {title}, курсор в середине',
+                   keyset.filter_after(ordered, list(position))[:keyset_size])
+        yield 'корзина', get_cart_queryset(self.user)
+        yield 'продукты в админке', Product.objects.all()[:100]
+
+    def check_plans(self, verbose):
+        failed = []
+        for title, queryset in self.get_querysets():
+            plan, problems = explain(queryset)
+            if problems:
+                failed.append(title)
+                self.stdout.write(self.style.ERROR(
+                    f'{title}: {"; ".join(problems)}'))
+            else:
+                self.stdout.write(f'{title}: OK')
+            if problems or verbose:
+                self.stdout.write(plan)
+        return failed
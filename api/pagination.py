@@ -1,9 +1,170 @@
-from rest_framework.pagination import PageNumberPagination
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from collections import OrderedDict
+
+import coreapi
+import coreschema
+from django.db.models import F, Func, IntegerField, Value
+from django.db.models.expressions import Col
+from django.db.models.lookups import Exact
+from django.db.models.sql.where import AND, WhereNode
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class RowValue(Func):
+    """Значение строки (a, b, c): сравнение таких значений база выполняет
+    как поиск по составному индексу, а не перебор условий OR."""
+    template = '(%(expressions)s)'
+    output_field = IntegerField()
+
+
+def get_fixed_fields(where):
+    """Поля, которым условия запроса задают одно значение (поле = x)."""
+    if not isinstance(where, WhereNode):
+        if isinstance(where, Exact) and isinstance(where.lhs, Col):
+            return {where.lhs.target.attname}
+        return set()
+    if where.connector != AND or where.negated:
+        return set()
+    return set().union(*map(get_fixed_fields, where.children))
 
 
 class CategoryPagination(PageNumberPagination):
     page_size = 3
 
 
+class KeysetPagination(BasePagination):
+    """Постраничный вывод по ключу без COUNT и OFFSET.
+
+    Курсор хранит значения полей ordering последней записи страницы,
+    следующая страница выбирается условием «строго после» по этим полям.
+    Записи всегда упорядочены по ordering, в том числе при поиске.
+    """
+    ordering = ('id',)
+    page_size = 5
+    max_page_size = 100
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    invalid_cursor_message = 'Неверный курсор'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        queryset = queryset.order_by(*self.ordering)
+        position = self.decode_cursor(request)
+        if position is not None:
+            queryset = self.filter_after(queryset, position)
+        results = list(queryset[:self.page_size + 1])
+        self.has_next = len(results) > self.page_size
+        self.page = results[:self.page_size]
+        return self.page
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        if page_size <= 0:
+            return self.page_size
+        return min(page_size, self.max_page_size)
+
+    def filter_after(self, queryset, position):
+        # Поля, отфильтрованные по равенству, одинаковы у всех записей:
+        # без них сравнение становится поиском по индексу сразу после
+        # этих полей, а не проходом от начала их значений.
+        fixed = get_fixed_fields(queryset.query.where)
+        fields, values = [], []
+        for field, value in zip(self.ordering, position):
+            if field not in fixed:
+                fields.append(F(field))
+                values.append(Value(value))
+        if not fields:
+            return queryset.none()
+        return queryset.alias(keyset_position=RowValue(*fields)).filter(
+            keyset_position__gt=RowValue(*values))
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            position = json.loads(urlsafe_b64decode(encoded.encode('ascii')))
+        except (TypeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+        if (not isinstance(position, list)
+                or len(position) != len(self.ordering)
+                or not all(isinstance(value, int) for value in position)):
+            raise NotFound(self.invalid_cursor_message)
+        return position
+
+    def encode_cursor(self, instance):
+        if isinstance(instance, dict):
+            position = [instance[field] for field in self.ordering]
+        else:
+            position = [getattr(instance, field) for field in self.ordering]
+        return urlsafe_b64encode(
+            json.dumps(position, separators=(',', ':')).encode()).decode()
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        return replace_query_param(
+            self.request.build_absolute_uri(), self.cursor_query_param,
+            self.encode_cursor(self.page[-1]))
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('results', data),
+        ]))
+
+
+class ProductKeysetPagination(KeysetPagination):
+    ordering = ('category_id', 'subcategory_id', 'id')
+
+
 class ProductPagination(PageNumberPagination):
+    """Постраничный вывод по номеру страницы или, если в запросе есть
+    параметр cursor (для первой страницы пустой), по ключу."""
     page_size = 5
+    keyset_pagination_class = ProductKeysetPagination
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.keyset = None
+        if self.keyset_pagination_class.cursor_query_param in (
+                request.query_params):
+            self.keyset = self.keyset_pagination_class()
+            return self.keyset.paginate_queryset(queryset, request, view)
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.keyset is not None:
+            return self.keyset.get_paginated_response(data)
+        return super().get_paginated_response(data)
+
+    def get_schema_fields(self, view):
+        keyset = self.keyset_pagination_class
+        return super().get_schema_fields(view) + [
+            coreapi.Field(
+                name=keyset.cursor_query_param, required=False,
+                location='query',
+                schema=coreschema.String(
+                    title='Cursor',
+                    description=('Постраничный вывод по курсору без '
+                                 'подсчёта общего количества. Для первой '
+                                 'страницы передайте пустое значение, '
+                                 'дальше — ссылку из поля next. Продукты '
+                                 'упорядочены по категории, подкатегории '
+                                 'и id, в том числе при поиске.'))),
+            coreapi.Field(
+                name=keyset.page_size_query_param, required=False,
+                location='query',
+                schema=coreschema.Integer(
+                    title='Page size',
+                    description=('Количество продуктов на странице в '
+                                 'режиме курсора, не больше '
+                                 f'{keyset.max_page_size}.'))),
+        ]
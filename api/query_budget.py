@@ -0,0 +1,46 @@
+from contextlib import ExitStack
+from functools import wraps
+
+from django.db import connections
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+class query_budget:
+    """Ограничивает число SQL-запросов внутри блока или функции.
+
+    Используется в тестах: при превышении бюджета выбрасывает
+    QueryBudgetExceeded со списком выполненных запросов.
+    """
+
+    def __init__(self, limit, name=None):
+        self.limit = limit
+        self.name = name
+        self.queries = []
+
+    def __call__(self, func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with query_budget(self.limit, self.name or func.__qualname__):
+                return func(*args, **kwargs)
+        return wrapper
+
+    def __enter__(self):
+        self._stack = ExitStack()
+        for connection in connections.all():
+            self._stack.enter_context(
+                connection.execute_wrapper(self._count))
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self._stack.close()
+        if exc_type is None and len(self.queries) > self.limit:
+            raise QueryBudgetExceeded('\n'.join((
+                f'{self.name or "block"}: {len(self.queries)} queries, '
+                f'budget is {self.limit}', *self.queries)))
+
+    def _count(self, execute, sql, params, many, context):
+        self.queries.append(sql)
+        return execute(sql, params, many, context)
@@ -2,15 +2,18 @@ from functools import partial
 
 from django.contrib.auth import get_user_model
 from djoser.serializers import UserCreateSerializer, UserSerializer
-from drf_yasg.utils import swagger_serializer_method
 from rest_framework import serializers
-from sorl.thumbnail import get_thumbnail
 
 from api.errors import messages
-from products.models import CartObject, Category, Product, Subcategory
+from products.models import (CartObject, Category, ProductListing,
+                             Subcategory)
+from products.thumbnails import get_thumbnail_urls
 
 User = get_user_model()
 
+# Наибольшее значение PositiveSmallIntegerField CartObject.amount.
+MAX_CART_AMOUNT = 32767
+
 CustomDecimalField = partial(serializers.DecimalField, max_digits=6,
                              decimal_places=2, coerce_to_string=False)
 
@@ -33,22 +36,20 @@ class CustomImageSerializer(serializers.ListField):
     child = serializers.ImageField()
 
     def to_representation(self, value):
-        sizes = ('128x128', '256x256', '512x512',)
         request = self.context.get('request', None)
-        return [request.build_absolute_uri(
-            get_thumbnail(value, size).url) for size in sizes]
+        return [request.build_absolute_uri(url)
+                for url in get_thumbnail_urls(value)]
 
 
 class ProductSerializer(serializers.ModelSerializer):
-    subcategory = serializers.SlugRelatedField(
-        read_only=True, slug_field='name')
-    category = serializers.SlugRelatedField(
-        read_only=True, slug_field='name')
-    images = CustomImageSerializer(source='image')
+    subcategory = serializers.CharField(source='subcategory_name',
+                                        read_only=True)
+    category = serializers.CharField(source='category_name', read_only=True)
+    images = CustomImageSerializer(source='*')
     price = CustomDecimalField()
 
     class Meta:
-        model = Product
+        model = ProductListing
         fields = ('id', 'name', 'slug', 'subcategory',
                   'price', 'category', 'images')
 
@@ -57,9 +58,9 @@ class CartObjectSerializer(serializers.ModelSerializer):
     id = serializers.PrimaryKeyRelatedField(source='product.pk',
                                             read_only=True)
     name = serializers.CharField(source='product.name', read_only=True)
-    amount = serializers.IntegerField()
+    amount = serializers.IntegerField(max_value=MAX_CART_AMOUNT)
     price = CustomDecimalField(source='product.price', read_only=True)
-    total_price = CustomDecimalField(read_only=True)
+    total_price = CustomDecimalField(max_digits=16, read_only=True)
 
     class Meta:
         model = CartObject
@@ -71,17 +72,44 @@ class CartObjectSerializer(serializers.ModelSerializer):
         return value
 
 
-class CartSerializer(serializers.ModelSerializer):
-    products = CartObjectSerializer(source='cart_of', many=True)
-    total = serializers.SerializerMethodField()
+class CartSerializer(serializers.Serializer):
+    products = CartObjectSerializer(many=True)
+    total = CustomDecimalField(max_digits=16)
+
+
+class CartOperationSerializer(serializers.Serializer):
+    ADD = 'add'
+    UPDATE = 'update'
+    REMOVE = 'remove'
+
+    product_id = serializers.IntegerField()
+    op = serializers.ChoiceField(choices=(ADD, UPDATE, REMOVE))
+    amount = serializers.IntegerField(required=False,
+                                      max_value=MAX_CART_AMOUNT)
+
+    def validate_amount(self, value):
+        if value < 1:
+            raise serializers.ValidationError(messages['not_less_1'])
+        return value
+
+    def validate(self, data):
+        if data['op'] == self.UPDATE and 'amount' not in data:
+            raise serializers.ValidationError(
+                {'amount': self.fields['amount'].error_messages['required']})
+        return data
+
+
+class CartOperationResultSerializer(serializers.Serializer):
+    product_id = serializers.IntegerField()
+    op = serializers.CharField()
+    status = serializers.IntegerField()
+    errors = serializers.CharField(required=False)
+    detail = serializers.CharField(required=False)
 
-    class Meta:
-        model = User
-        fields = ('products', 'total')
 
-    @swagger_serializer_method(serializer_or_field=CustomDecimalField())
-    def get_total(self, obj):
-        return sum(object.total_price for object in obj.cart_of.all())
+class CartBatchSerializer(serializers.Serializer):
+    results = CartOperationResultSerializer(many=True)
+    cart = CartSerializer()
 
 
 class CustomUserCreateSerializer(UserCreateSerializer):
@@ -0,0 +1,40 @@
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from api.authentication import token_cache
+from api.cache import invalidate_catalog
+from products.importer import products_imported
+from products.listing import listings_rebuilt
+from products.models import Category, Product, Subcategory
+from products.thumbnails import thumbnails_generated
+from store.routers import pin_to_primary
+
+User = get_user_model()
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_save, sender=Subcategory)
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Category)
+@receiver(post_delete, sender=Subcategory)
+@receiver(post_delete, sender=Product)
+@receiver(thumbnails_generated)
+@receiver(products_imported)
+@receiver(listings_rebuilt)
+def invalidate_catalog_cache(sender, **kwargs):
+    transaction.on_commit(pin_to_primary)
+    transaction.on_commit(invalidate_catalog)
+
+
+@receiver(post_delete, sender=Token)
+def forget_token(sender, instance, **kwargs):
+    token_cache.delete(instance.key)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def forget_user_tokens(sender, instance, **kwargs):
+    token_cache.delete_user(instance.pk)
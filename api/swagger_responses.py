@@ -4,8 +4,10 @@ from rest_framework import status
 from rest_framework.validators import UniqueTogetherValidator
 
 from api.errors import (err_already_in_cart, err_dict_401_unauthorized,
-                        err_dict_404_not_found, err_not_in_cart, messages)
-from api.serializers import CartSerializer, CustomUserSerializer
+                        err_dict_403_forbidden, err_dict_404_not_found,
+                        err_not_in_cart, messages)
+from api.serializers import (CartBatchSerializer, CartSerializer,
+                             CustomUserSerializer)
 
 token_logout_responses = {status.HTTP_204_NO_CONTENT: openapi.Response(
     'Токен удалён'), **err_dict_401_unauthorized}
@@ -90,3 +92,63 @@ delete_all_cart_responses = {
     status.HTTP_204_NO_CONTENT: openapi.Response(
         'Успешная очистка корзины'), **err_dict_401_unauthorized
 }
+
+batch_shopping_cart_responses = {
+    status.HTTP_200_OK: openapi.Response(
+        'Операции применены, возвращены их результаты и корзина',
+        CartBatchSerializer),
+    status.HTTP_400_BAD_REQUEST: openapi.Response(
+        'Ошибки валидации',
+        examples={
+            'application/json': [{}, {'amount': [messages['not_less_1']]}]
+        }
+    ), **err_dict_401_unauthorized
+}
+
+db_pool_stats_responses = {
+    status.HTTP_200_OK: openapi.Response(
+        'Настройки соединений и состояние пулов по базам данных',
+        examples={'application/json': {'default': {
+            'engine': 'store.db.backends.postgresql_pool',
+            'conn_max_age': 60, 'conn_health_checks': True,
+            'pool': {'max_size': 10, 'active': 1, 'idle': 3, 'waiting': 0,
+                     'waits': 2, 'wait_time_total': 0.0123,
+                     'wait_time_max': 0.0101, 'wait_time_avg': 0.00615,
+                     'timeouts': 0, 'created': 4, 'discarded': 0}}}}),
+    **err_dict_401_unauthorized, **err_dict_403_forbidden
+}
+
+request_stats_responses = {
+    status.HTTP_200_OK: openapi.Response(
+        'Статистика запросов по маршрутам и профили медленных запросов',
+        examples={'application/json': {
+            'routes': {'GET /api/shopping_cart/': {
+                'count': 120, 'errors': 0, 'avg_ms': 4.21, 'p50_ms': 3.87,
+                'p95_ms': 7.02, 'p99_ms': 11.4, 'max_ms': 15.3,
+                'db_queries_avg': 1.0, 'db_ms_avg': 1.12,
+                'serialize_ms_avg': 0.84, 'render_ms_avg': 0.05,
+                'thumbnails_ms_avg': 0.0}},
+            'slowest_profiles': [{
+                'route': 'GET /api/shopping_cart/', 'duration_ms': 15.3,
+                'profile': '...'}]}}),
+    **err_dict_401_unauthorized, **err_dict_403_forbidden
+}
+
+request_stats_reset_responses = {
+    status.HTTP_204_NO_CONTENT: openapi.Response('Статистика сброшена'),
+    **err_dict_401_unauthorized, **err_dict_403_forbidden
+}
+
+export_products_responses = {
+    status.HTTP_200_OK: openapi.Response(
+        'Продукты в формате NDJSON, по одному в строке. Заголовок '
+        'X-Next-Since — значение since для следующей выгрузки',
+        examples={'application/x-ndjson': (
+            '{"id":1,"name":"Сыр российский","slug":"syr-rossijskij",'
+            '"subcategory":"Сыр","price":123.45,"category":'
+            '"Молочные продукты","images":["http://localhost/media/..."]}')}),
+    status.HTTP_400_BAD_REQUEST: openapi.Response(
+        'Неверное значение параметра',
+        examples={'application/json': {'since': [messages['invalid_since']]}}),
+    **err_dict_401_unauthorized
+}
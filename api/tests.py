@@ -0,0 +1,777 @@
+import json
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+from io import StringIO
+from tempfile import TemporaryDirectory
+from threading import Barrier, Thread
+from unittest import mock, skipUnless
+from urllib.parse import quote
+
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.core.management import CommandError, call_command
+from django.db import DEFAULT_DB_ALIAS, connection, connections, transaction
+from django.db.models import F, Q
+from django.test import (Client, RequestFactory, TestCase,
+                         TransactionTestCase, override_settings,
+                         skipUnlessDBFeature)
+from django.test.utils import CaptureQueriesContext
+from rest_framework.authtoken.models import Token
+from rest_framework.renderers import JSONRenderer
+
+from api.authentication import CachedTokenAuthentication, token_cache
+from api.cache import CATALOG_CACHE, get_catalog_version, invalidate_catalog
+from api.fast_serializers import CategoryFastSerializer, ProductFastSerializer
+from api.pagination import get_fixed_fields
+from api.query_budget import query_budget
+from api.renderers import FastJSONRenderer
+from api.serializers import (CartSerializer, CategorySerializer,
+                             ProductSerializer)
+from api.views import get_cart_data
+from products import cart
+from products.models import (CartObject, Category, Product, ProductListing,
+                             Subcategory)
+from store.db.explain import explain
+from store.instrumentation import request_stats
+from store.openapi import get_built_schema_name, write_schema
+from store.routers import ReplicaRouter, replica_reads
+
+User = get_user_model()
+
+
+def create_catalog(categories=2, subcategories=2, products=3):
+    """Каталог для тестов: в каждой подкатегории products продуктов."""
+    created = []
+    for number in range(categories):
+        category = Category.objects.create(
+            name=f'Категория {number}', slug=f'category-{number}',
+            image='products/сыр.jpg')
+        for sub_number in range(subcategories):
+            subcategory = Subcategory.objects.create(
+                name=f'Подкатегория {number}-{sub_number}',
+                slug=f'subcategory-{number}-{sub_number}',
+                category=category, image='products/сыр.jpg')
+            for product_number in range(products):
+                slug = f'product-{number}-{sub_number}-{product_number}'
+                created.append(Product.objects.create(
+                    name=f'Сыр {slug}', slug=slug, price='10.50',
+                    category=category, subcategory=subcategory,
+                    image='products/сыр.jpg'))
+    return created
+
+
+LOCMEM_CACHES = {
+    name: {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+           'LOCATION': name}
+    for name in settings.CACHES}
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class QueryBudgetTests(TestCase):
+    """Число SQL-запросов на запрос к API, включая аутентификацию
+    (токен ищется в базе только при первом запросе теста).
+
+    Кеши подменяются на кеши в памяти: запросы DatabaseCache зависят от
+    выбранного бэкенда и в бюджет не входят.
+
+    Бюджеты фиксируют текущее поведение: рост числа запросов — регрессия
+    (например, N+1 при сериализации).
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.products = create_catalog()
+        cls.user = User.objects.create_user(
+            username='budget', email='budget@example.com',
+            password='Vq7-lodka-Mx2')
+        cls.token = Token.objects.create(user=cls.user)
+        CartObject.objects.bulk_create(
+            CartObject(user=cls.user, product=product)
+            for product in cls.products[:5])
+
+    def setUp(self):
+        caches[CATALOG_CACHE].clear()
+        token_cache.clear()
+        self.client.defaults.update(
+            SERVER_NAME=settings.ALLOWED_HOSTS[0],
+            HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def request(self, budget, method, path, data=None, status=200):
+        with query_budget(budget, f'{method} {path}'):
+            response = self.client.generic(
+                method, path, b'' if data is None else
+                self.client._encode_json(data, 'application/json'),
+                content_type='application/json')
+        self.assertEqual(response.status_code, status, response.content)
+        return response
+
+    def test_catalog(self):
+        product = self.products[-1]
+        for path, budget in (
+                ('/api/categories/', 4),
+                ('/api/products/', 2),
+                (f'/api/products/?category={product.category_id}', 3),
+                (f'/api/products/?subcategory={product.subcategory_id}', 3),
+                ('/api/products/?search=сыр', 2),
+                ('/api/products/?cursor=', 1),
+                (f'/api/products/{product.pk}/', 1)):
+            with self.subTest(path=path):
+                self.request(budget, 'GET', path)
+
+    def test_cached_catalog(self):
+        self.request(3, 'GET', '/api/products/')
+        self.request(0, 'GET', '/api/products/')
+
+    def test_not_modified(self):
+        response = self.request(3, 'GET', '/api/products/')
+        etag, last_modified = response['ETag'], response['Last-Modified']
+        self.client.defaults['HTTP_IF_NONE_MATCH'] = etag
+        self.request(0, 'GET', '/api/products/', status=304)
+        del self.client.defaults['HTTP_IF_NONE_MATCH']
+        self.client.defaults['HTTP_IF_MODIFIED_SINCE'] = last_modified
+        self.request(0, 'GET', '/api/products/', status=304)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.products[0].save()
+        del self.client.defaults['HTTP_IF_MODIFIED_SINCE']
+        self.client.defaults['HTTP_IF_NONE_MATCH'] = etag
+        response = self.request(3, 'GET', '/api/products/')
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_etag_media_type(self):
+        etag = self.request(3, 'GET', '/api/products/')['ETag']
+        self.client.defaults['HTTP_ACCEPT'] = 'text/html'
+        self.assertNotEqual(self.client.get('/api/products/')['ETag'], etag)
+
+    def test_cart(self):
+        product_id = self.products[-1].pk
+        path = f'/api/products/{product_id}/shopping_cart/'
+        self.request(2, 'GET', '/api/shopping_cart/')
+        self.request(1, 'POST', path, status=201)
+        self.request(1, 'PATCH', path, {'amount': 3})
+        self.request(1, 'DELETE', path, status=204)
+
+    def test_cart_amount_limit(self):
+        product_id = self.products[-1].pk
+        path = f'/api/products/{product_id}/shopping_cart/'
+        self.request(2, 'POST', path, status=201)
+        self.request(2, 'PATCH', path, {'amount': 32768}, status=400)
+        self.request(1, 'PATCH', path, {'amount': 32767})
+        response = self.request(0, 'POST', '/api/shopping_cart/batch/', [
+            {'product_id': self.products[-2].pk, 'op': 'add',
+             'amount': 32768}], status=400)
+        self.assertIn('amount', response.json()[0])
+
+    def test_cart_batch(self):
+        operations = [{'product_id': product.pk, 'op': 'add'}
+                      for product in self.products[5:10]]
+        operations += [{'product_id': product.pk, 'op': 'remove'}
+                       for product in self.products[:3]]
+        self.request(8, 'POST', '/api/shopping_cart/batch/', operations)
+
+    def test_async_catalog(self):
+        product = self.products[-1]
+        for path, budget in (
+                ('categories/', 4),
+                ('products/', 2),
+                (f'products/?category={product.category_id}', 3),
+                (f'products/?search={quote("сыр")}&page=2', 2),
+                (f'products/{product.pk}/', 1)):
+            with self.subTest(path=path):
+                response = self.request(budget, 'GET', f'/api/async/{path}')
+                self.assertEqual(
+                    response.content.replace(b'/api/async/', b'/api/'),
+                    self.client.get(f'/api/{path}').content)
+
+    def test_async_cart(self):
+        product_id = self.products[-1].pk
+        path = f'/api/async/products/{product_id}/shopping_cart/'
+        response = self.request(2, 'GET', '/api/async/shopping_cart/')
+        self.assertEqual(response.content,
+                         self.client.get('/api/shopping_cart/').content)
+        self.request(1, 'POST', path, status=201)
+        self.request(1, 'PATCH', path, {'amount': 3})
+        self.request(1, 'DELETE', path, status=204)
+        self.request(1, 'DELETE', '/api/async/shopping_cart/', status=204)
+
+
+class FastSerializerTests(TestCase):
+    """Быстрые сериализаторы и запрос корзины дают тот же JSON, что и
+    обычные сериализаторы DRF."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.products = create_catalog()
+        listing = ProductListing.objects.get(pk=cls.products[0].pk)
+        listing.thumbnails = {
+            'source': listing.image.name,
+            'sizes': {size: f'/media/cache/1/{size}.jpg'
+                      for size in settings.IMAGE_VARIANT_SIZES}}
+        listing.save()
+
+    def setUp(self):
+        self.context = {'request': RequestFactory(
+            SERVER_NAME=settings.ALLOWED_HOSTS[0]).get('/api/products/')}
+
+    def assertSameJSON(self, first, second):
+        renderer = JSONRenderer()
+        self.assertEqual(renderer.render(first), renderer.render(second))
+
+    def test_products(self):
+        listings = ProductListing.objects.order_by('pk')
+        fast = ProductFastSerializer(
+            ProductFastSerializer.get_values(listings), many=True,
+            context=self.context).data
+        self.assertEqual(len(set(map(str, (row['images'] for row in fast)))),
+                         2)
+        self.assertSameJSON(fast, ProductSerializer(
+            listings, many=True, context=self.context).data)
+
+    def test_categories(self):
+        categories = Category.objects.order_by('pk')
+        self.assertSameJSON(
+            CategoryFastSerializer(
+                CategoryFastSerializer.get_values(categories), many=True,
+                context=self.context).data,
+            CategorySerializer(categories.prefetch_related('subcategories'),
+                               many=True, context=self.context).data)
+
+    def test_cart(self):
+        user = User.objects.create_user(
+            username='fast', email='fast@example.com',
+            password='Vq7-lodka-Mx2')
+        CartObject.objects.bulk_create(
+            CartObject(user=user, product=product, amount=number + 1)
+            for number, product in enumerate(self.products[:4]))
+        cart_objects = list(
+            CartObject.objects.filter(user=user).select_related('product')
+            .annotate(total_price=F('amount') * F('product__price')))
+        self.assertSameJSON(get_cart_data(user), CartSerializer({
+            'products': cart_objects,
+            'total': sum(cart_object.total_price
+                         for cart_object in cart_objects)}).data)
+
+
+class FastJSONRendererTests(TestCase):
+    """FastJSONRenderer отдаёт те же байты, что и JSONRenderer DRF."""
+
+    def test_render(self):
+        moment = datetime(2024, 2, 29, 23, 59, 58, 123456)
+        data = {
+            'decimals': [Decimal('10.50'), Decimal('0.1'), Decimal('-3')],
+            'datetimes': [moment, moment.replace(tzinfo=timezone.utc),
+                          moment.replace(tzinfo=timezone(timedelta(
+                              hours=3))),
+                          moment.date(), moment.time()],
+            'text': 'Сыр «Российский» 🧀 \u2028\u2029 "\\/</script>',
+            1: None,
+            'nested': [{'ключ': True, 'float': 1.5, 'big': 2 ** 53}, []],
+        }
+        for accepted_media_type in ('application/json',
+                                    'application/json; indent=2'):
+            with self.subTest(accepted_media_type=accepted_media_type):
+                self.assertEqual(
+                    FastJSONRenderer().render(data, accepted_media_type),
+                    JSONRenderer().render(data, accepted_media_type))
+        self.assertEqual(FastJSONRenderer().render(None), b'')
+
+
+class TokenCacheTests(TestCase):
+
+    def setUp(self):
+        token_cache.clear()
+        self.user = User.objects.create_user(
+            username='cached', email='cached@example.com',
+            password='Vq7-lodka-Mx2')
+        self.token = Token.objects.create(user=self.user)
+        self.client.defaults.update(
+            SERVER_NAME=settings.ALLOWED_HOSTS[0],
+            HTTP_AUTHORIZATION=f'Token {self.token.key}')
+        self.authentication = CachedTokenAuthentication()
+
+    def get_cart(self):
+        return self.client.get('/api/shopping_cart/').status_code
+
+    def test_fresh_user(self):
+        first, _ = self.authentication.authenticate_credentials(
+            self.token.key)
+        with self.assertNumQueries(0):
+            second, token = self.authentication.authenticate_credentials(
+                self.token.key)
+        self.assertIsNot(first, second)
+        self.assertEqual((second.pk, second.username, token.user),
+                         (self.user.pk, 'cached', second))
+
+    def test_async(self):
+        request = RequestFactory().get(
+            '/', HTTP_AUTHORIZATION=f'Token {self.token.key}')
+        for _ in range(2):
+            user, token = async_to_sync(
+                self.authentication.aauthenticate)(request)
+            self.assertEqual((user.pk, token.key),
+                             (self.user.pk, self.token.key))
+        self.assertIsNone(async_to_sync(self.authentication.aauthenticate)(
+            RequestFactory().get('/')))
+
+    def test_logout(self):
+        self.assertEqual(self.get_cart(), 200)
+        self.assertEqual(
+            self.client.post('/api/auth/token/logout/').status_code, 204)
+        self.assertIsNone(token_cache.get(self.token.key))
+        self.assertEqual(self.get_cart(), 401)
+
+    def test_deactivation(self):
+        self.assertEqual(self.get_cart(), 200)
+        self.user.is_active = False
+        self.user.save()
+        self.assertIsNone(token_cache.get(self.token.key))
+        self.assertEqual(self.get_cart(), 401)
+
+    def test_password_change(self):
+        self.assertEqual(self.get_cart(), 200)
+        self.user.set_password('Zr4-kedr-Lp9')
+        self.user.save()
+        self.assertIsNone(token_cache.get(self.token.key))
+
+
+class CatalogVersionTests(TestCase):
+
+    def setUp(self):
+        self.cache = caches[CATALOG_CACHE]
+        self.cache.clear()
+
+    def test_invalidate(self):
+        version = get_catalog_version(self.cache)
+        # Версия не должна истекать вместе с записями кеша.
+        with mock.patch.object(self.cache, 'default_timeout', -1):
+            invalidate_catalog()
+        self.assertGreater(get_catalog_version(self.cache), version)
+
+    def test_clear(self):
+        invalidate_catalog()
+        version = get_catalog_version(self.cache)
+        self.cache.clear()
+        self.assertGreater(get_catalog_version(self.cache), version)
+
+
+class ProductExportTests(TestCase):
+    """Выгрузка каталога в NDJSON и продолжение с X-Next-Since."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.products = create_catalog(categories=1, subcategories=2)
+        # Половина продуктов изменена в один и тот же момент.
+        cls.moment = datetime(2024, 1, 1, 12, tzinfo=timezone.utc)
+        ProductListing.objects.update(updated_at=cls.moment)
+        ProductListing.objects.filter(
+            pk__in=[product.pk for product in cls.products[::2]]).update(
+            updated_at=cls.moment + timedelta(seconds=1))
+        user = User.objects.create_user(
+            username='export', email='export@example.com',
+            password='Vq7-lodka-Mx2')
+        cls.token = Token.objects.create(user=user)
+
+    def setUp(self):
+        self.client.defaults.update(
+            SERVER_NAME=settings.ALLOWED_HOSTS[0],
+            HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def export(self, since=None):
+        response = self.client.get('/api/products/export/',
+                                   {} if since is None else {'since': since})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        ids = [json.loads(line)['id'] for line in b''.join(
+            response.streaming_content).splitlines()]
+        return ids, response['X-Next-Since']
+
+    def test_invalid_since(self):
+        for since in ('вчера', '2024-13-01T00:00:00'):
+            with self.subTest(since=since):
+                response = self.client.get('/api/products/export/',
+                                           {'since': since})
+                self.assertEqual(response.status_code, 400)
+                self.assertIn('since', json.loads(response.content))
+
+    def test_since(self):
+        listings = ProductListing.objects.order_by('updated_at', 'id')
+        ids, _ = self.export()
+        self.assertEqual(ids, list(listings.values_list('id', flat=True)))
+        # Граница включается; время без пояса — в TIME_ZONE (UTC).
+        later = self.moment + timedelta(seconds=1)
+        expected = list(listings.filter(updated_at__gte=later).values_list(
+            'id', flat=True))
+        self.assertEqual(len(expected), len(self.products) // 2)
+        for since in (later.isoformat(), later.strftime('%Y-%m-%dT%H:%M:%SZ'),
+                      later.replace(tzinfo=None).isoformat()):
+            with self.subTest(since=since):
+                self.assertEqual(self.export(since)[0], expected)
+
+    @mock.patch('api.views.ProductViewSet.export_chunk_size', 2)
+    def test_resume(self):
+        # Продукты с одинаковым updated_at попадают в разные пачки
+        # по chunk_size, порядок между ними задаёт id.
+        ids, next_since = self.export(self.moment.isoformat())
+        self.assertEqual(sorted(ids), sorted(
+            product.pk for product in self.products))
+        self.assertEqual(len(set(ids)), len(ids))
+        self.assertEqual(self.export(next_since)[0], [])
+        changed = self.products[3]
+        with self.captureOnCommitCallbacks(execute=True):
+            changed.save()
+        ids, resumed_since = self.export(next_since)
+        self.assertEqual(ids, [changed.pk])
+        self.assertGreaterEqual(resumed_since, next_since)
+
+
+class InstrumentationTests(TestCase):
+    """Заголовок Server-Timing, лог store.performance и статистика
+    запросов для администраторов."""
+
+    @classmethod
+    def setUpTestData(cls):
+        create_catalog(categories=1, subcategories=1)
+        cls.admin = User.objects.create_superuser(
+            username='admin', email='admin@example.com',
+            password='Vq7-lodka-Mx2')
+        cls.user = User.objects.create_user(
+            username='stats', email='stats@example.com',
+            password='Vq7-lodka-Mx2')
+
+    def setUp(self):
+        request_stats.reset()
+        self.client.defaults['SERVER_NAME'] = settings.ALLOWED_HOSTS[0]
+
+    def test_server_timing(self):
+        response = self.client.get('/api/products/')
+        self.assertRegex(
+            response['Server-Timing'],
+            r'^total;dur=[\d.]+, db;dur=[\d.]+;desc="[1-9]\d* queries"'
+            r'(, (serialize|render|thumbnails);dur=[\d.]+)*$')
+        with override_settings(PERFORMANCE_SERVER_TIMING=False):
+            self.assertNotIn('Server-Timing',
+                             self.client.get('/api/products/'))
+
+    def test_log_levels(self):
+        with self.assertNoLogs('store.performance', 'WARNING'):
+            self.client.get('/api/products/')
+        with self.assertLogs('store.performance', 'INFO') as logs:
+            self.client.get('/api/products/')
+            with override_settings(PERFORMANCE_SLOW_REQUEST_MS=0):
+                self.client.get('/api/categories/')
+        self.assertEqual([record.levelname for record in logs.records],
+                         ['INFO', 'WARNING'])
+        self.assertEqual(json.loads(logs.records[1].getMessage())['route'],
+                         '/api/categories/')
+
+    def test_request_stats(self):
+        path = '/api/stats/requests/'
+        self.client.get('/api/products/')
+        self.client.get('/api/products/')
+        self.assertEqual(self.client.get(path).status_code, 401)
+        self.client.defaults['HTTP_AUTHORIZATION'] = (
+            f'Token {Token.objects.create(user=self.user)}')
+        self.assertEqual(self.client.get(path).status_code, 403)
+        self.assertEqual(self.client.delete(path).status_code, 403)
+        self.client.defaults['HTTP_AUTHORIZATION'] = (
+            f'Token {Token.objects.create(user=self.admin)}')
+        response = self.client.get(path)
+        self.assertEqual(response.status_code, 200)
+        stats = response.json()['routes']['GET /api/products/']
+        self.assertEqual((stats['count'], stats['errors']), (2, 0))
+        self.assertGreater(stats['db_queries_avg'], 0)
+        self.assertEqual(self.client.delete(path).status_code, 204)
+        # Сам DELETE учитывается уже после сброса.
+        self.assertEqual(list(request_stats.get_stats()['routes']),
+                         ['DELETE /api/stats/requests/'])
+
+
+class KeysetPaginationTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        create_catalog(categories=3, subcategories=3, products=2)
+
+    def walk(self, path):
+        ids, url = [], path
+        while url is not None:
+            response = self.client.get(
+                url, SERVER_NAME=settings.ALLOWED_HOSTS[0])
+            self.assertEqual(response.status_code, 200)
+            ids += [product['id'] for product in response.data['results']]
+            url = response.data['next']
+        return ids
+
+    def test_pages(self):
+        listings = ProductListing.objects.order_by(
+            'category_id', 'subcategory_id', 'id')
+        product = listings.last()
+        for query, lookups in (
+                ('', {}),
+                (f'&category={product.category_id}',
+                 {'category': product.category_id}),
+                (f'&subcategory={product.subcategory_id}',
+                 {'subcategory': product.subcategory_id}),
+                # При поиске курсор сохраняет порядок по ключу, а не по
+                # релевантности.
+                ('&search=' + quote('сыр'), {})):
+            with self.subTest(query=query):
+                self.assertEqual(
+                    self.walk('/api/products/?cursor=&page_size=2' + query),
+                    list(listings.filter(**lookups).values_list(
+                        'id', flat=True)))
+
+    def test_invalid_cursor(self):
+        response = self.client.get('/api/products/?cursor=abc',
+                                   SERVER_NAME=settings.ALLOWED_HOSTS[0])
+        self.assertEqual(response.status_code, 404)
+
+
+class QueryPlanTests(TestCase):
+
+    def test_fixed_fields(self):
+        self.assertEqual(get_fixed_fields(ProductListing.objects.filter(
+            category=1, subcategory_id=2, id__gt=3).query.where),
+            {'category_id', 'subcategory_id'})
+        self.assertEqual(get_fixed_fields(ProductListing.objects.filter(
+            Q(category=1) | Q(subcategory=2)).query.where), set())
+
+    @skipUnless(connection.vendor == 'sqlite', 'план SQLite')
+    def test_index_scan(self):
+        create_catalog()
+        listings = ProductListing.objects.order_by('category_name', 'id')
+        # Первая страница без условий останавливается после LIMIT.
+        self.assertEqual(explain(listings[:5])[1], [])
+        for queryset in (listings[5:10], listings.filter(price__gt=1)[:5]):
+            plan, problems = explain(queryset)
+            self.assertTrue(problems, plan)
+
+    def test_check_query_plans(self):
+        call_command('check_query_plans', products=2000, categories=5,
+                     subcategories=4, users=20, cart_size=5,
+                     stdout=StringIO())
+
+
+class OpenAPISchemaTests(TestCase):
+
+    def setUp(self):
+        directory = TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        settings_override = override_settings(
+            OPENAPI_SCHEMA_ROOT=directory.name)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def check_schema(self):
+        call_command('build_openapi_schema', '--check', stdout=StringIO())
+
+    def test_build_and_check(self):
+        with self.assertRaisesMessage(CommandError, 'собрана не была'):
+            self.check_schema()
+        call_command('build_openapi_schema', stdout=StringIO())
+        self.check_schema()
+        name = get_built_schema_name()
+        response = self.client.get('/redoc/',
+                                   SERVER_NAME=settings.ALLOWED_HOSTS[0])
+        self.assertContains(response, f'/redoc/{name}')
+        response = self.client.get(f'/redoc/{name}',
+                                   SERVER_NAME=settings.ALLOWED_HOSTS[0])
+        self.assertIn('immutable', response['Cache-Control'])
+        schema = json.loads(b''.join(response.streaming_content))
+        self.assertIn('/products/', schema['paths'])
+
+    def test_stale_schema(self):
+        write_schema(b'{}')
+        with self.assertRaisesMessage(CommandError, 'устарела'):
+            self.check_schema()
+
+
+class CartOperationsTests(TestCase):
+
+    def test_concurrent_add(self):
+        """Строку добавил параллельный запрос после того, как пакет
+        прочитал корзину."""
+        first, second = create_catalog(categories=1, subcategories=1,
+                                       products=2)
+        user = User.objects.create_user(
+            username='batch', email='batch@example.com',
+            password='Vq7-lodka-Mx2')
+        CartObject.objects.create(user=user, product=first, amount=2)
+        lock_cart = cart._lock_cart
+        calls = []
+
+        def lock_after_first_call(user, product_ids):
+            calls.append(product_ids)
+            return lock_cart(user, product_ids) if len(calls) > 1 else {}
+
+        with mock.patch.object(cart, '_lock_cart', lock_after_first_call):
+            outcomes = cart.apply_cart_operations(user, [
+                {'product_id': second.pk, 'op': 'add'},
+                {'product_id': first.pk, 'op': 'add'},
+                {'product_id': first.pk, 'op': 'update', 'amount': 5}])
+        self.assertEqual(outcomes, [cart.CREATED, cart.ALREADY_IN_CART,
+                                    cart.UPDATED])
+        self.assertEqual(len(calls), 2)
+        self.assertEqual(
+            dict(CartObject.objects.filter(user=user).values_list(
+                'product_id', 'amount')),
+            {first.pk: 5, second.pk: 1})
+
+
+@skipUnlessDBFeature('test_db_allows_multiple_connections')
+class CartConcurrencyTests(TransactionTestCase):
+    """Одновременные запросы к корзине из нескольких потоков, у каждого
+    своё соединение с базой."""
+    threads = 8
+
+    def setUp(self):
+        self.products = create_catalog(categories=1, subcategories=1,
+                                       products=self.threads)
+        self.user = User.objects.create_user(
+            username='parallel', email='parallel@example.com',
+            password='Vq7-lodka-Mx2')
+        self.token = Token.objects.create(user=self.user)
+
+    def run_parallel(self, requests):
+        barrier = Barrier(len(requests))
+        statuses = [None] * len(requests)
+
+        def send(index, method, path, data):
+            client = Client(SERVER_NAME=settings.ALLOWED_HOSTS[0],
+                            HTTP_AUTHORIZATION=f'Token {self.token.key}')
+            try:
+                barrier.wait()
+                statuses[index] = client.generic(
+                    method, path, b'' if data is None else
+                    client._encode_json(data, 'application/json'),
+                    content_type='application/json').status_code
+            finally:
+                connections.close_all()
+
+        threads = [Thread(target=send, args=(index, *request))
+                   for index, request in enumerate(requests)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return statuses
+
+    def test_parallel_add(self):
+        path = f'/api/products/{self.products[0].pk}/shopping_cart/'
+        statuses = self.run_parallel([('POST', path, None)] * self.threads)
+        self.assertEqual(sorted(statuses),
+                         [201] + [400] * (self.threads - 1))
+        self.assertEqual(CartObject.objects.filter(user=self.user).count(),
+                         1)
+
+    def test_parallel_batch_add(self):
+        product_id = self.products[0].pk
+        statuses = self.run_parallel([(
+            'POST', '/api/shopping_cart/batch/',
+            [{'product_id': product_id, 'op': 'add'}])] * self.threads)
+        self.assertEqual(statuses, [200] * self.threads)
+        self.assertEqual(CartObject.objects.filter(user=self.user).count(),
+                         1)
+
+    def test_parallel_update(self):
+        CartObject.objects.bulk_create(
+            CartObject(user=self.user, product=product)
+            for product in self.products)
+        statuses = self.run_parallel([
+            ('PATCH', f'/api/products/{product.pk}/shopping_cart/',
+             {'amount': index + 2})
+            for index, product in enumerate(self.products)])
+        self.assertEqual(statuses, [200] * self.threads)
+        self.assertEqual(
+            dict(CartObject.objects.filter(user=self.user).values_list(
+                'product_id', 'amount')),
+            {product.pk: index + 2
+             for index, product in enumerate(self.products)})
+
+
+# Реплика для ReplicaRoutingTests: второе соединение с тестовой базой,
+# настроенное как replica_N в settings.DATABASES. Алиас нужен до создания
+# тестовых баз, поэтому добавляется при импорте модуля.
+REPLICA_ALIAS = 'replica_test'
+connections.settings[REPLICA_ALIAS] = {
+    **connections.settings[DEFAULT_DB_ALIAS],
+    'TEST': {**connections.settings[DEFAULT_DB_ALIAS]['TEST'],
+             'MIRROR': DEFAULT_DB_ALIAS}}
+
+
+@override_settings(CACHES=LOCMEM_CACHES, REPLICA_DATABASES=[REPLICA_ALIAS])
+class ReplicaRoutingTests(TransactionTestCase):
+    """Чтение каталога с реплики и возврат клиента на основную базу после
+    изменяющего запроса.
+
+    Тест не в транзакции: иначе соединение реплики не увидело бы данных.
+    """
+    databases = {DEFAULT_DB_ALIAS, REPLICA_ALIAS}
+
+    def setUp(self):
+        self.products = create_catalog(categories=1, subcategories=1)
+        user = User.objects.create_user(
+            username='replica', email='replica@example.com',
+            password='Vq7-lodka-Mx2')
+        self.client.defaults.update(
+            SERVER_NAME=settings.ALLOWED_HOSTS[0],
+            HTTP_AUTHORIZATION=f'Token {Token.objects.create(user=user)}')
+        self.anonymous = Client(SERVER_NAME=settings.ALLOWED_HOSTS[0])
+        # Создание каталога отправило всех клиентов на основную базу.
+        caches[CATALOG_CACHE].clear()
+
+    def catalog_databases(self, client, path):
+        """Базы, с которых client прочитал каталог по запросу к path."""
+        with CaptureQueriesContext(connections[DEFAULT_DB_ALIAS]) as primary, \
+                CaptureQueriesContext(connections[REPLICA_ALIAS]) as replica:
+            response = client.get(path)
+        self.assertEqual(response.status_code, 200, response.content)
+        return {alias for alias, context in ((DEFAULT_DB_ALIAS, primary),
+                                             (REPLICA_ALIAS, replica))
+                if any('"products_' in query['sql']
+                       for query in context.captured_queries)}
+
+    def test_router(self):
+        router = ReplicaRouter()
+        self.assertEqual(router.db_for_read(Product), DEFAULT_DB_ALIAS)
+        token = replica_reads.set(True)
+        try:
+            self.assertEqual(router.db_for_read(Product), REPLICA_ALIAS)
+            self.assertEqual(router.db_for_read(CartObject), DEFAULT_DB_ALIAS)
+            self.assertEqual(router.db_for_write(Product), DEFAULT_DB_ALIAS)
+            with transaction.atomic():
+                self.assertEqual(router.db_for_read(Product),
+                                 DEFAULT_DB_ALIAS)
+        finally:
+            replica_reads.reset(token)
+
+    def test_reads(self):
+        for path in ('/api/products/', '/api/async/products/',
+                     f'/api/products/{self.products[0].pk}/'):
+            with self.subTest(path=path):
+                self.assertEqual(self.catalog_databases(self.client, path),
+                                 {REPLICA_ALIAS})
+        self.assertEqual(
+            self.client.get('/api/products/').json()['count'],
+            len(self.products))
+
+    def test_sticky_after_write(self):
+        response = self.client.post(
+            f'/api/products/{self.products[0].pk}/shopping_cart/')
+        self.assertEqual(response.status_code, 201, response.content)
+        self.assertEqual(self.catalog_databases(
+            self.client, '/api/products/'), {DEFAULT_DB_ALIAS})
+        self.assertEqual(self.catalog_databases(
+            self.client, '/api/async/products/'), {DEFAULT_DB_ALIAS})
+        self.assertEqual(self.catalog_databases(
+            self.anonymous, '/api/categories/'), {REPLICA_ALIAS})
+        # Отметки хранятся в кеше каталога и пропадают вместе с ним.
+        caches[CATALOG_CACHE].clear()
+        self.assertEqual(self.catalog_databases(
+            self.client, '/api/categories/?page=1'), {REPLICA_ALIAS})
+
+    def test_catalog_change(self):
+        self.products[0].save()
+        self.assertEqual(self.catalog_databases(
+            self.anonymous, '/api/products/'), {DEFAULT_DB_ALIAS})
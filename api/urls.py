@@ -1,8 +1,11 @@
 from django.urls import include, path
 from rest_framework import routers
 
-from api.views import (ProductViewSet, categories_view, shopping_cart_view,
-                       token_login, token_logout, users_create, users_me)
+from api import async_views
+from api.views import (ProductViewSet, categories_view, db_pool_stats_view,
+                       request_stats_view, shopping_cart_batch_view,
+                       shopping_cart_view, token_login, token_logout,
+                       users_create, users_me)
 
 app_name = 'api'
 
@@ -17,6 +20,15 @@ authtoken_urls = [
 ]
 
 
+async_urls = [
+    path('categories/', async_views.categories_view),
+    path('products/', async_views.products_view),
+    path('products/<int:pk>/', async_views.product_view),
+    path('products/<int:pk>/shopping_cart/',
+         async_views.shopping_cart_detail),
+    path('shopping_cart/', async_views.shopping_cart_view),
+]
+
 products_router = routers.DefaultRouter()
 products_router.register('products', ProductViewSet, basename='products')
 
@@ -24,6 +36,10 @@ urlpatterns = [
     path('categories/', categories_view),
     path('users/', include(users_urls)),
     path('shopping_cart/', shopping_cart_view),
+    path('shopping_cart/batch/', shopping_cart_batch_view),
     path('auth/token/', include(authtoken_urls)),
+    path('async/', include(async_urls)),
+    path('stats/db_pool/', db_pool_stats_view),
+    path('stats/requests/', request_stats_view),
     path('', include(products_router.urls)),
 ]
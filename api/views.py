@@ -1,25 +1,41 @@
-from django.contrib.auth import get_user_model
-from django.db.models import F, Prefetch
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import connections
+from django.db.models import DecimalField, F, RowRange, Sum, Window
+from django.http import Http404, StreamingHttpResponse
 from django.shortcuts import get_object_or_404
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
 from django.utils.decorators import method_decorator
 from django_filters.rest_framework import DjangoFilterBackend
 from djoser.views import TokenCreateView, TokenDestroyView, UserViewSet
 from drf_yasg import openapi
 from drf_yasg.utils import no_body, swagger_auto_schema
-from rest_framework import filters, generics, permissions, status, viewsets
+from rest_framework import generics, permissions, status, viewsets
 from rest_framework.decorators import action, api_view, permission_classes
+from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
 
 from api import swagger_responses
-from api.errors import (err_already_in_cart, err_dict_404_not_found,
-                        err_not_in_cart)
+from api.cache import cache_catalog_response
+from api.conditional import conditional_catalog_response
+from api.errors import (ErrorMessage, err_404_not_found, err_already_in_cart,
+                        err_dict_404_not_found, err_not_in_cart, messages)
+from api.fast_serializers import (CategoryFastSerializer, FastSerializerMixin,
+                                  ProductFastSerializer)
+from api.filters import ProductSearchFilter
 from api.pagination import CategoryPagination, ProductPagination
-from api.serializers import (CartObjectSerializer, CartSerializer,
-                             CategorySerializer, CustomUserCreateSerializer,
-                             ProductSerializer)
-from products.models import CartObject, Category, Product
-
-User = get_user_model()
+from api.renderers import FastJSONRenderer, NDJSONRenderer
+from api.serializers import (CartObjectSerializer, CartOperationSerializer,
+                             CartSerializer, CategorySerializer,
+                             CustomUserCreateSerializer, ProductSerializer)
+from products.cart import (ALREADY_IN_CART, CREATED, DELETED, NOT_FOUND,
+                           NOT_IN_CART, UPDATED, add_to_cart,
+                           apply_cart_operations, remove_from_cart)
+from products.models import CartObject, Category, Product, ProductListing
+from store.db.pool import get_pool_stats
+from store.instrumentation import request_stats, timed
 
 token_login = swagger_auto_schema(
     method='POST', tags=['Авторизация'], operation_id='Получение токена',
@@ -60,9 +76,13 @@ get_product_responses = {**{
 }, **err_dict_404_not_found}
 
 
-class CategoryListView(generics.ListAPIView):
+@method_decorator(name='list', decorator=conditional_catalog_response)
+@method_decorator(name='list', decorator=cache_catalog_response)
+class CategoryListView(FastSerializerMixin, generics.ListAPIView):
+    # Подкатегории загружает CategoryFastSerializer одним запросом.
     queryset = Category.objects.all()
     serializer_class = CategorySerializer
+    fast_serializer_class = CategoryFastSerializer
     pagination_class = CategoryPagination
 
 
@@ -72,10 +92,16 @@ categories_view = swagger_auto_schema(
         CategoryListView.as_view())
 
 
+@method_decorator(name='list', decorator=conditional_catalog_response)
+@method_decorator(name='retrieve', decorator=conditional_catalog_response)
+@method_decorator(name='list', decorator=cache_catalog_response)
+@method_decorator(name='retrieve', decorator=cache_catalog_response)
 @method_decorator(name='list', decorator=swagger_auto_schema(
     operation_description=('Получение списка продуктов. '
                            'Доступна фильтрация по id категории '
-                           'и подкатегории, поиск по названию.'),
+                           'и подкатегории, поиск по названию, '
+                           'постраничный вывод по номеру страницы '
+                           'или по курсору.'),
     operation_id='Список продуктов', tags=['Продукты'], security=[]
 ))
 @method_decorator(name='retrieve', decorator=swagger_auto_schema(
@@ -83,13 +109,15 @@ categories_view = swagger_auto_schema(
     operation_id='Продукт', tags=['Продукты'],
     responses=get_product_responses, security=[]
 ))
-class ProductViewSet(viewsets.ReadOnlyModelViewSet):
-    queryset = Product.objects.all().select_related()
+class ProductViewSet(FastSerializerMixin, viewsets.ReadOnlyModelViewSet):
+    queryset = ProductListing.objects.all()
     serializer_class = ProductSerializer
+    fast_serializer_class = ProductFastSerializer
     pagination_class = ProductPagination
-    filter_backends = (DjangoFilterBackend, filters.SearchFilter)
+    filter_backends = (DjangoFilterBackend, ProductSearchFilter)
     filterset_fields = ('subcategory', 'category',)
     search_fields = ('name',)
+    export_chunk_size = 2000
 
     @swagger_auto_schema(
         method='POST', request_body=no_body,
@@ -111,34 +139,125 @@ class ProductViewSet(viewsets.ReadOnlyModelViewSet):
             url_path='shopping_cart',
             permission_classes=[permissions.IsAuthenticated])
     def shopping_cart_detail(self, request, pk):
-        product = get_object_or_404(Product, pk=pk)
+        try:
+            product_id = int(pk)
+        except ValueError:
+            raise Http404
         current_user = request.user
-        cart_objects = current_user.cart_of.filter(product=product)
         match request.method:
             case 'POST':
-                if not cart_objects.exists():
-                    CartObject.objects.create(
-                        user=self.request.user, product=product)
+                if add_to_cart(current_user.pk, product_id):
                     return Response(status=status.HTTP_201_CREATED)
+                get_object_or_404(Product, pk=product_id)
                 return err_already_in_cart.get_error_response()
             case 'PATCH':
-                if cart_objects.exists():
-                    cart_object = cart_objects[0]
-                    serializer = CartObjectSerializer(
-                        cart_object,
-                        data=request.data,
-                        partial=True)
-                    serializer.is_valid(raise_exception=True)
-                    serializer.save()
+                serializer = CartObjectSerializer(data=request.data,
+                                                  partial=True)
+                if not serializer.is_valid():
+                    get_object_or_404(Product, pk=product_id)
+                    if not current_user.cart_of.filter(
+                            product=product_id).exists():
+                        return err_not_in_cart.get_error_response()
+                    raise ValidationError(serializer.errors)
+                amount = serializer.validated_data.get('amount', F('amount'))
+                if current_user.cart_of.filter(product=product_id).update(
+                        amount=amount):
                     return Response(status=status.HTTP_200_OK)
+                get_object_or_404(Product, pk=product_id)
                 return err_not_in_cart.get_error_response()
             case 'DELETE':
-                if not cart_objects.exists():
-                    return err_not_in_cart.get_error_response()
-                cart_objects.delete()
-                return Response(status=status.HTTP_204_NO_CONTENT)
+                if remove_from_cart(current_user.pk, product_id):
+                    return Response(status=status.HTTP_204_NO_CONTENT)
+                get_object_or_404(Product, pk=product_id)
+                return err_not_in_cart.get_error_response()
         return Response(status=status.HTTP_405_METHOD_NOT_ALLOWED)
 
+    @swagger_auto_schema(
+        method='GET',
+        manual_parameters=[openapi.Parameter(
+            'since', openapi.IN_QUERY, type=openapi.TYPE_STRING,
+            format=openapi.FORMAT_DATETIME,
+            description=('Выгрузить только продукты, изменённые начиная с '
+                         'этого момента (ISO 8601), например значение '
+                         'заголовка X-Next-Since прошлой выгрузки'))],
+        responses=swagger_responses.export_products_responses,
+        tags=['Продукты'],
+        operation_id='Выгрузка каталога',
+        operation_description=('Весь каталог одним потоковым ответом в '
+                               'формате NDJSON: по продукту в строке, поля '
+                               'как в списке продуктов. Доступна фильтрация '
+                               'по id категории и подкатегории. Продукты '
+                               'упорядочены по времени изменения.'))
+    @action(detail=False, methods=('GET',), url_path='export',
+            permission_classes=[permissions.IsAuthenticated],
+            pagination_class=None, filter_backends=(DjangoFilterBackend,),
+            renderer_classes=(NDJSONRenderer, FastJSONRenderer))
+    def export(self, request):
+        # FastJSONRenderer — для ошибок клиентам, принимающим только JSON;
+        # сам поток всегда в NDJSON.
+        since = request.query_params.get('since')
+        if since:
+            try:
+                since = parse_datetime(since)
+            except ValueError:
+                since = None
+            if since is None:
+                raise ValidationError({'since': [messages['invalid_since']]})
+            if timezone.is_naive(since):
+                since = timezone.make_aware(since)
+        # Продукты, изменённые во время выгрузки, попадут и в следующую.
+        started = timezone.now()
+        queryset = self.filter_queryset(self.get_queryset()).order_by(
+            'updated_at', 'id')
+        if since:
+            queryset = queryset.filter(updated_at__gte=since)
+        # Ответ читается после выхода из middleware, поэтому базу (реплику)
+        # выбираем сейчас.
+        queryset = queryset.using(queryset.db)
+        response = StreamingHttpResponse(
+            self.stream_products(queryset),
+            content_type=NDJSONRenderer.media_type)
+        response['X-Next-Since'] = started.strftime('%Y-%m-%dT%H:%M:%S.%fZ')
+        return response
+
+    def stream_products(self, queryset):
+        serializer = self.get_serializer()
+        renderer = NDJSONRenderer()
+        lines = []
+        for row in queryset.iterator(chunk_size=self.export_chunk_size):
+            lines.append(renderer.render(serializer.to_representation(row)))
+            if len(lines) == self.export_chunk_size:
+                yield b'\n'.join(lines) + b'\n'
+                lines = []
+        if lines:
+            yield b'\n'.join(lines) + b'\n'
+
+
+def get_cart_queryset(user):
+    line_total = F('amount') * F('product__price')
+    # Окно упорядочено как сама корзина, поэтому база берёт порядок из
+    # индекса cart_user_recent_idx и не сортирует строки повторно;
+    # рамка по-прежнему охватывает всю корзину.
+    return (
+        CartObject.objects.filter(user=user).select_related('product')
+        .only('amount', 'product__name', 'product__price')
+        .annotate(total_price=line_total,
+                  cart_total=Window(Sum(line_total),
+                                    order_by=F('id').desc(),
+                                    frame=RowRange(None, None),
+                                    output_field=DecimalField(
+                                        max_digits=16, decimal_places=2))))
+
+
+@timed('serialize')
+def serialize_cart(cart_objects):
+    total = cart_objects[0].cart_total if cart_objects else Decimal(0)
+    return CartSerializer({'products': cart_objects, 'total': total}).data
+
+
+def get_cart_data(user):
+    return serialize_cart(list(get_cart_queryset(user)))
+
 
 @swagger_auto_schema(
     method='GET',
@@ -156,16 +275,106 @@ def shopping_cart_view(request):
     current_user = request.user
     match request.method:
         case 'GET':
-            user_obj = User.objects.prefetch_related(
-                Prefetch(
-                    'cart_of',
-                    queryset=CartObject.objects.select_related(
-                        'product').annotate(
-                            total_price=F('amount') * F('product__price')))
-            ).get(pk=current_user.id)
-            serializer = CartSerializer(user_obj)
-            return Response(serializer.data, status=status.HTTP_200_OK)
+            return Response(get_cart_data(current_user),
+                            status=status.HTTP_200_OK)
         case 'DELETE':
             current_user.cart_of.all().delete()
             return Response(status=status.HTTP_204_NO_CONTENT)
     return Response(status=status.HTTP_405_METHOD_NOT_ALLOWED)
+
+
+cart_operation_results = {
+    CREATED: status.HTTP_201_CREATED,
+    UPDATED: status.HTTP_200_OK,
+    DELETED: status.HTTP_204_NO_CONTENT,
+    NOT_FOUND: err_404_not_found,
+    ALREADY_IN_CART: err_already_in_cart,
+    NOT_IN_CART: err_not_in_cart,
+}
+
+
+@swagger_auto_schema(
+    method='POST',
+    request_body=CartOperationSerializer(many=True),
+    responses=swagger_responses.batch_shopping_cart_responses,
+    tags=['Корзина'],
+    operation_id='Пакетное изменение корзины',
+    operation_description=('Добавление (add), изменение количества '
+                           '(update) и удаление (remove) нескольких '
+                           'продуктов одним запросом. Для каждой операции '
+                           'возвращается код, как у запросов к '
+                           'products/{id}/shopping_cart/, и ошибка, '
+                           'если она есть.'))
+@api_view(['POST'])
+@permission_classes([permissions.IsAuthenticated])
+def shopping_cart_batch_view(request):
+    serializer = CartOperationSerializer(
+        data=request.data, many=True,
+        max_length=settings.CART_BATCH_MAX_OPERATIONS)
+    serializer.is_valid(raise_exception=True)
+    operations = serializer.validated_data
+    results = []
+    for operation, outcome in zip(
+            operations, apply_cart_operations(request.user, operations)):
+        result = {'product_id': operation['product_id'],
+                  'op': operation['op']}
+        outcome = cart_operation_results[outcome]
+        if isinstance(outcome, ErrorMessage):
+            result.update(status=outcome.status,
+                          **outcome.get_errors_context())
+        else:
+            result['status'] = outcome
+        results.append(result)
+    return Response({'results': results,
+                     'cart': get_cart_data(request.user)},
+                    status=status.HTTP_200_OK)
+
+
+@swagger_auto_schema(
+    method='GET',
+    responses=swagger_responses.db_pool_stats_responses,
+    tags=['Статистика'],
+    operation_id='Соединения с базой данных',
+    operation_description=('Настройки постоянных соединений и метрики '
+                           'пулов текущего процесса: занятые и свободные '
+                           'соединения, ожидание соединения. Только для '
+                           'администраторов.'))
+@api_view(['GET'])
+@permission_classes([permissions.IsAdminUser])
+def db_pool_stats_view(request):
+    pools = get_pool_stats()
+    return Response({
+        connection.alias: {
+            'engine': connection.settings_dict['ENGINE'],
+            'conn_max_age': connection.settings_dict['CONN_MAX_AGE'],
+            'conn_health_checks': (
+                connection.settings_dict['CONN_HEALTH_CHECKS']),
+            'pool': pools.get(connection.alias),
+        } for connection in connections.all()
+    })
+
+
+@swagger_auto_schema(
+    method='GET',
+    responses=swagger_responses.request_stats_responses,
+    tags=['Статистика'],
+    operation_id='Время обработки запросов',
+    operation_description=('Статистика запросов текущего процесса по '
+                           'маршрутам: количество, перцентили времени, '
+                           'запросы к базе, время сериализации, рендеринга '
+                           'и миниатюр, а также профили самых медленных '
+                           'запросов из выборки. Только для '
+                           'администраторов.'))
+@swagger_auto_schema(
+    method='DELETE',
+    responses=swagger_responses.request_stats_reset_responses,
+    tags=['Статистика'],
+    operation_id='Сброс статистики запросов',
+    operation_description='Только для администраторов.')
+@api_view(['GET', 'DELETE'])
+@permission_classes([permissions.IsAdminUser])
+def request_stats_view(request):
+    if request.method == 'DELETE':
+        request_stats.reset()
+        return Response(status=status.HTTP_204_NO_CONTENT)
+    return Response(request_stats.get_stats())
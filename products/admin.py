@@ -1,29 +1,122 @@
+from django import forms
 from django.contrib import admin
+from django.contrib.admin.widgets import AutocompleteSelect
+from django.core.paginator import Paginator
+from django.db.models import Prefetch
+from django.utils.functional import cached_property
 
 from products.models import Category, Product, Subcategory
+from products.search import search_products
+from store.db.count import estimate_count
+
+
+class EstimatedCountPaginator(Paginator):
+    """Paginator, который на больших таблицах берёт количество строк из
+    статистики планировщика вместо COUNT(*).
+
+    Последние страницы по такой оценке могут оказаться пустыми или
+    недоступными; точное количество считается, только если строк меньше
+    exact_count_limit.
+    """
+    exact_count_limit = 10000
+
+    @cached_property
+    def count(self):
+        estimate = estimate_count(self.object_list)
+        if estimate is None or estimate < self.exact_count_limit:
+            return super().count
+        return estimate
+
+
+class AutocompleteFilter(admin.FieldListFilter):
+    """Фильтр по внешнему ключу с полем автодополнения вместо списка
+    всех связанных объектов.
+
+    Варианты подгружает стандартное представление автодополнения
+    админки, поэтому у админки связанной модели должны быть
+    search_fields.
+    """
+    template = 'admin/products/autocomplete_filter.html'
+
+    def __init__(self, field, request, params, model, model_admin,
+                 field_path):
+        self.lookup_kwarg = f'{field_path}__{field.target_field.name}__exact'
+        self.lookup_val = params.get(self.lookup_kwarg)
+        super().__init__(field, request, params, model, model_admin,
+                         field_path)
+        self.title = field.verbose_name
+        self.form_field = forms.ModelChoiceField(
+            queryset=field.remote_field.model._default_manager.all(),
+            widget=AutocompleteSelect(field, model_admin.admin_site),
+            required=False)
+
+    def has_output(self):
+        return True
+
+    def expected_parameters(self):
+        return [self.lookup_kwarg]
+
+    def choices(self, changelist):
+        query_string = changelist.get_query_string(
+            remove=[self.lookup_kwarg])
+        yield {'selected': self.lookup_val is None,
+               'query_string': query_string, 'display': 'Все'}
+        yield {'selected': self.lookup_val is not None,
+               'widget': self.form_field.widget.render(
+                   self.lookup_kwarg, self.lookup_val,
+                   attrs={'data-query-string': query_string,
+                          'style': 'width: 100%'})}
+
+
+class LargeTableAdmin(admin.ModelAdmin):
+    paginator = EstimatedCountPaginator
+    # Без второго COUNT(*) по всей таблице рядом с найденным количеством.
+    show_full_result_count = False
+
+    @property
+    def media(self):
+        return (super().media + AutocompleteSelect(None, self.admin_site).media
+                + forms.Media(js=('products/admin/autocomplete_filter.js',)))
 
 
 @admin.register(Category)
-class CategoryAdmin(admin.ModelAdmin):
+class CategoryAdmin(LargeTableAdmin):
     list_display = ('pk', 'name', 'slug', 'get_subcategories')
+    search_fields = ('name', 'slug')
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).prefetch_related(Prefetch(
+            'subcategories', queryset=Subcategory.objects.order_by(
+                'id').only('id', 'name', 'category_id')))
 
     def get_subcategories(self, obj):
         return '; '.join([p.__str__() for p in obj.subcategories.all()])
-    
+
     get_subcategories.short_description = 'ПОДКАТЕГОРИИ'
 
 
 @admin.register(Subcategory)
-class SubcategoryAdmin(admin.ModelAdmin):
+class SubcategoryAdmin(LargeTableAdmin):
     list_display = ('pk', 'name', 'slug', 'category')
+    list_select_related = ('category',)
+    list_filter = (('category', AutocompleteFilter),)
+    search_fields = ('name', 'slug')
 
 @admin.register(Product)
-class ProductAdmin(admin.ModelAdmin):
+class ProductAdmin(LargeTableAdmin):
     list_display = ('pk', 'name', 'slug', 'subcategory', 'get_category')
-    list_filter = ('subcategory', 'subcategory__category')
+    list_select_related = ('category', 'subcategory')
+    list_filter = (('category', AutocompleteFilter),
+                   ('subcategory', AutocompleteFilter))
     search_fields = ('name',)
 
+    def get_search_results(self, request, queryset, search_term):
+        # Поиск по индексам products.search вместо LIKE по всей таблице.
+        if not search_term:
+            return queryset, False
+        return search_products(queryset, search_term), False
+
     def get_category(self, obj):
-        return obj.subcategory.category.name
-    
+        return obj.category.name
+
     get_category.short_description = 'КАТЕГОРИЯ'
@@ -0,0 +1,138 @@
+from django.db import connections, router, transaction
+
+from products.models import CartObject, Product
+
+
+def _execute(sql, params):
+    connection = connections[router.db_for_write(CartObject)]
+    with connection.cursor() as cursor:
+        cursor.execute(sql.format(
+            cart=connection.ops.quote_name(CartObject._meta.db_table),
+            product=connection.ops.quote_name(Product._meta.db_table)),
+            params)
+        return cursor.rowcount
+
+
+def add_to_cart(user_id, product_id, amount=1):
+    """Добавляет продукт в корзину одним INSERT ... ON CONFLICT.
+
+    Возвращает False, если продукт уже в корзине или его не существует.
+    """
+    return _execute(
+        'INSERT INTO {cart} (user_id, product_id, amount) '
+        'SELECT %s, id, %s FROM {product} WHERE id = %s '
+        'ON CONFLICT (user_id, product_id) DO NOTHING',
+        (user_id, amount, product_id)) == 1
+
+
+def remove_from_cart(user_id, product_id):
+    return _execute(
+        'DELETE FROM {cart} WHERE user_id = %s AND product_id = %s',
+        (user_id, product_id)) == 1
+
+
+CREATED = 'created'
+UPDATED = 'updated'
+DELETED = 'deleted'
+NOT_FOUND = 'not_found'
+ALREADY_IN_CART = 'already_in_cart'
+NOT_IN_CART = 'not_in_cart'
+
+
+def _insert_cart_objects(user_id, amounts):
+    """Добавляет строки корзины одним INSERT ... ON CONFLICT DO NOTHING.
+
+    Возвращает id продуктов, строки которых добавлены.
+    """
+    if not amounts:
+        return set()
+    connection = connections[router.db_for_write(CartObject)]
+    values = ', '.join(['(%s, %s, %s)'] * len(amounts))
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'INSERT INTO '
+            f'{connection.ops.quote_name(CartObject._meta.db_table)} '
+            f'(user_id, product_id, amount) VALUES {values} '
+            f'ON CONFLICT (user_id, product_id) DO NOTHING '
+            f'RETURNING product_id',
+            [value for product_id, amount in amounts.items()
+             for value in (user_id, product_id, amount)])
+        return {product_id for product_id, in cursor.fetchall()}
+
+
+def _plan_cart_operations(operations, existing, cart):
+    """Проверяет операции по порядку на копии корзины в памяти.
+
+    Возвращает итоговые количества продуктов и результат каждой операции.
+    """
+    amounts = {product_id: cart_object.amount
+               for product_id, cart_object in cart.items()}
+    outcomes = []
+    for operation in operations:
+        product_id = operation['product_id']
+        if product_id not in existing:
+            outcomes.append(NOT_FOUND)
+        elif operation['op'] == 'add':
+            if product_id in amounts:
+                outcomes.append(ALREADY_IN_CART)
+            else:
+                amounts[product_id] = operation.get('amount', 1)
+                outcomes.append(CREATED)
+        elif product_id not in amounts:
+            outcomes.append(NOT_IN_CART)
+        elif operation['op'] == 'update':
+            amounts[product_id] = operation['amount']
+            outcomes.append(UPDATED)
+        else:
+            del amounts[product_id]
+            outcomes.append(DELETED)
+    return amounts, outcomes
+
+
+def _lock_cart(user, product_ids):
+    return {cart_object.product_id: cart_object
+            for cart_object in CartObject.objects.select_for_update()
+            .filter(user=user, product__in=product_ids).order_by()}
+
+
+def apply_cart_operations(user, operations):
+    """Применяет к корзине список операций add/update/remove.
+
+    Операции проверяются по порядку на копии корзины в памяти, затем все
+    изменения записываются в одной транзакции: один INSERT, bulk_update и
+    один DELETE. Если параллельный запрос успел добавить в корзину один
+    из новых продуктов, добавленные строки удаляются, а операции
+    проверяются заново уже с его строкой: для add это ALREADY_IN_CART.
+    Возвращает результат для каждой операции.
+    """
+    product_ids = {operation['product_id'] for operation in operations}
+    existing = set(Product.objects.filter(pk__in=product_ids).order_by()
+                   .values_list('pk', flat=True))
+    with transaction.atomic(using=router.db_for_write(CartObject)):
+        cart = _lock_cart(user, existing)
+        while True:
+            amounts, outcomes = _plan_cart_operations(
+                operations, existing, cart)
+            created = {product_id: amount
+                       for product_id, amount in amounts.items()
+                       if product_id not in cart}
+            inserted = _insert_cart_objects(user.pk, created)
+            if len(inserted) == len(created):
+                break
+            if inserted:
+                CartObject.objects.filter(
+                    user=user, product__in=inserted).delete()
+            cart.update(_lock_cart(user, created.keys() - inserted))
+
+        changed = []
+        for product_id, cart_object in cart.items():
+            if amounts.get(product_id, cart_object.amount) != (
+                    cart_object.amount):
+                cart_object.amount = amounts[product_id]
+                changed.append(cart_object)
+        CartObject.objects.bulk_update(changed, ('amount',))
+        removed = [cart_object.pk for product_id, cart_object in cart.items()
+                   if product_id not in amounts]
+        if removed:
+            CartObject.objects.filter(pk__in=removed).delete()
+    return outcomes
@@ -0,0 +1,75 @@
+from hashlib import sha1
+
+from django.conf import settings
+from django.core.cache import caches
+from django.http import JsonResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import quote_etag
+from django.views.decorators.http import require_GET
+
+from products.models import Category
+from store.cache_versions import bump_version, get_version
+
+VERSION_KEY = 'chaining:subcategories:version'
+
+
+def invalidate_subcategories():
+    bump_version(caches[settings.CHAINING_CACHE], VERSION_KEY)
+
+
+def subcategories_key(version, category_id):
+    return f'chaining:subcategories:{version}:{category_id}'
+
+
+def build_subcategory_map():
+    """Подкатегории всех категорий одним запросом в формате
+    smart_selects: {id категории: [{'value': id, 'display': название}]}.
+
+    Категории без подкатегорий тоже попадают в карту, с пустым списком.
+    """
+    subcategories = {}
+    for category_id, pk, name in Category.objects.order_by(
+            'pk', 'subcategories__name').values_list(
+                'pk', 'subcategories__pk', 'subcategories__name'):
+        items = subcategories.setdefault(category_id, [])
+        if pk is not None:
+            items.append({'value': pk, 'display': name})
+    return subcategories
+
+
+def get_subcategories(cache, version, category_ids):
+    keys = [subcategories_key(version, category_id)
+            for category_id in category_ids]
+    cached = cache.get_many(keys)
+    if len(cached) < len(set(keys)):
+        # Карта собирается и кладётся в кеш целиком, чтобы следующие
+        # категории уже не требовали запросов к базе.
+        subcategories = build_subcategory_map()
+        cache.set_many({subcategories_key(version, category_id): items
+                        for category_id, items in subcategories.items()})
+        cached = {subcategories_key(version, category_id):
+                  subcategories.get(category_id, [])
+                  for category_id in category_ids}
+    return [item for key in keys for item in cached[key]]
+
+
+@require_GET
+def chained_subcategories(request, value):
+    """Замена представления smart_selects для Product.subcategory.
+
+    Отдаёт подкатегории выбранных категорий из кеша, а повторные
+    запросы браузера получают 304 по ETag без обращения к кешу карты.
+    """
+    cache = caches[settings.CHAINING_CACHE]
+    version = get_version(cache, VERSION_KEY)
+    etag = quote_etag(sha1(f'{version}:{value}'.encode()).hexdigest())
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        category_ids = [int(category_id) for category_id in value.split(',')
+                        if category_id.isdigit()]
+        response = JsonResponse(
+            get_subcategories(cache, version, category_ids), safe=False)
+    response['ETag'] = etag
+    patch_cache_control(response, private=True,
+                        max_age=settings.CHAINING_CACHE_MAX_AGE)
+    return response
@@ -0,0 +1,207 @@
+import csv
+import io
+import json
+from decimal import Decimal, InvalidOperation
+
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_slug
+from django.db import connections, router, transaction
+from django.dispatch import Signal
+from django.utils import timezone
+
+from products.models import Category, Product, Subcategory
+
+# Отправляется после сохранения каждой пачки импорта вместо post_save:
+# products — продукты пачки с полями id, name, image и thumbnails.
+products_imported = Signal()
+
+FIELDS = ('name', 'slug', 'price', 'category', 'subcategory', 'image')
+COLUMNS = ('name', 'slug', 'price', 'category_id', 'subcategory_id', 'image')
+UPDATE_FIELDS = ('name', 'price', 'category', 'subcategory', 'image',
+                 'updated_at')
+STAGING_TABLE = 'products_product_import'
+MAX_ERRORS = 20
+
+
+class InvalidRow(ValueError):
+    pass
+
+
+def read_csv(file):
+    yield from csv.DictReader(file)
+
+
+def read_jsonl(file):
+    for line in file:
+        if line.strip():
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError as error:
+                # Строка пропускается при проверке, как и другие неверные.
+                yield InvalidRow(f'неверный JSON: {error.msg}')
+
+
+READERS = {'csv': read_csv, 'jsonl': read_jsonl}
+
+
+class CatalogImporter:
+    """Загружает продукты пачками с обновлением существующих по slug.
+
+    Категории и подкатегории ищутся по slug в словарях, собранных один
+    раз. В PostgreSQL пачка копируется через COPY во временную таблицу и
+    переносится одним INSERT ... ON CONFLICT, в остальных базах
+    сохраняется через bulk_create(update_conflicts=True).
+    """
+
+    def __init__(self, batch_size=5000, use_copy=None):
+        self.batch_size = batch_size
+        self.connection = connections[router.db_for_write(Product)]
+        if use_copy is None:
+            use_copy = self.connection.vendor == 'postgresql'
+        self.use_copy = use_copy
+        self.categories = dict(Category.objects.values_list('slug', 'pk'))
+        self.subcategories = {
+            slug: (pk, category_id) for slug, pk, category_id in
+            Subcategory.objects.values_list('slug', 'pk', 'category_id')}
+        self.read = self.created = self.updated = self.skipped = 0
+        self.errors = []
+
+    def import_rows(self, rows):
+        """Загружает строки, после каждой пачки отдаёт число прочитанных."""
+        batch = {}
+        names = {}
+        for number, data in enumerate(rows, start=1):
+            self.read += 1
+            try:
+                row = self.build_row(data)
+                name, slug = row[:2]
+                if names.get(name, slug) != slug:
+                    raise InvalidRow(f'название {name!r} уже у продукта '
+                                     f'{names[name]!r}')
+            except InvalidRow as error:
+                self.skip(number, error)
+                continue
+            # Повтор slug в пачке: побеждает последняя строка.
+            if slug in batch:
+                del names[batch[slug][1][0]]
+            batch[slug] = number, row
+            names[name] = slug
+            if len(batch) == self.batch_size:
+                self.save_batch(self.check_names(batch))
+                batch = {}
+                names = {}
+                yield self.read
+        if batch:
+            self.save_batch(self.check_names(batch))
+        yield self.read
+
+    def skip(self, number, error):
+        self.skipped += 1
+        if len(self.errors) < MAX_ERRORS:
+            self.errors.append(f'строка {number}: {error}')
+
+    def check_names(self, batch):
+        """Пропускает строки, название которых уже у другого продукта.
+
+        Название продукта уникально: такая строка остановила бы
+        сохранение всей пачки.
+        """
+        taken = dict(Product.objects.filter(
+            name__in=[row[0] for number, row in batch.values()])
+            .values_list('name', 'slug'))
+        rows = []
+        for number, row in batch.values():
+            name, slug = row[:2]
+            if taken.get(name, slug) != slug:
+                self.skip(number, InvalidRow(
+                    f'название {name!r} уже у продукта {taken[name]!r}'))
+            else:
+                rows.append(row)
+        return rows
+
+    def build_row(self, data):
+        if isinstance(data, InvalidRow):
+            raise data
+        if not isinstance(data, dict):
+            raise InvalidRow('ожидался объект с полями продукта')
+        values = {field: str(data.get(field) or '').strip()
+                  for field in FIELDS}
+        missing = [field for field in FIELDS
+                   if not values[field] and field != 'category']
+        if missing:
+            raise InvalidRow(f'не заполнены поля {", ".join(missing)}')
+        name, slug = values['name'], values['slug']
+        if len(name) > Product._meta.get_field('name').max_length:
+            raise InvalidRow('слишком длинное название')
+        try:
+            validate_slug(slug)
+        except ValidationError:
+            raise InvalidRow(f'неверный slug {slug!r}')
+        if len(slug) > Product._meta.get_field('slug').max_length:
+            raise InvalidRow('слишком длинный slug')
+        try:
+            price = Decimal(values['price'].replace(',', '.'))
+        except InvalidOperation:
+            raise InvalidRow(f'неверная цена {values["price"]!r}')
+        if not Decimal('0.01') <= price < Decimal('10000'):
+            raise InvalidRow(f'цена {price} вне допустимого диапазона')
+        try:
+            subcategory_id, category_id = self.subcategories[
+                values['subcategory']]
+        except KeyError:
+            raise InvalidRow(
+                f'нет подкатегории {values["subcategory"]!r}')
+        if values['category'] and (
+                self.categories.get(values['category']) != category_id):
+            raise InvalidRow(f'подкатегория {values["subcategory"]!r} не '
+                             f'из категории {values["category"]!r}')
+        return (name, slug, price.quantize(Decimal('0.01')), category_id,
+                subcategory_id, values['image'])
+
+    @transaction.atomic
+    def save_batch(self, rows):
+        if not rows:
+            return
+        slugs = [row[1] for row in rows]
+        existing = Product.objects.filter(slug__in=slugs).count()
+        self.updated += existing
+        self.created += len(rows) - existing
+        if self.use_copy:
+            self.copy_rows(rows)
+        else:
+            Product.objects.bulk_create(
+                [Product(**dict(zip(COLUMNS, row))) for row in rows],
+                update_conflicts=True, unique_fields=('slug',),
+                update_fields=UPDATE_FIELDS)
+        products_imported.send(
+            sender=Product, products=list(
+                Product.objects.filter(slug__in=slugs).order_by().only(
+                    'id', 'name', 'image', 'thumbnails')))
+
+    def copy_rows(self, rows):
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows(rows)
+        buffer.seek(0)
+        table = Product._meta.db_table
+        columns = ', '.join(COLUMNS)
+        with self.connection.cursor() as cursor:
+            cursor.execute(self.staging_table_sql())
+            cursor.copy_expert(
+                f'COPY {STAGING_TABLE} ({columns}) FROM STDIN '
+                f'WITH (FORMAT csv)', buffer)
+            cursor.execute(
+                f'INSERT INTO {table} ({columns}, thumbnails, updated_at) '
+                f'SELECT {columns}, %s::jsonb, %s FROM {STAGING_TABLE} '
+                f'ON CONFLICT (slug) DO UPDATE SET '
+                + ', '.join(f'{column} = EXCLUDED.{column}'
+                            for column in COLUMNS + ('updated_at',)
+                            if column != 'slug'),
+                ['{}', timezone.now()])
+
+    def staging_table_sql(self):
+        # Таблица живёт до конца соединения, строки — до конца транзакции.
+        columns = ', '.join(
+            f'{field.column} {field.db_type(self.connection)}'
+            for field in map(Product._meta.get_field, FIELDS))
+        return (f'CREATE TEMPORARY TABLE IF NOT EXISTS {STAGING_TABLE} '
+                f'({columns}) ON COMMIT DELETE ROWS')
@@ -0,0 +1,75 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.core.exceptions import ObjectDoesNotExist
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from products.models import ThumbnailJob
+from products.thumbnails import generate_thumbnails, thumbnails_outdated
+
+
+def enqueue_thumbnails(instance):
+    job, _ = ThumbnailJob.objects.get_or_create(
+        content_type=ContentType.objects.get_for_model(instance),
+        object_id=instance.pk, status=ThumbnailJob.PENDING)
+    return job
+
+
+def enqueue_many_thumbnails(instances):
+    """То же, что enqueue_thumbnails, одним запросом для многих объектов."""
+    ThumbnailJob.objects.bulk_create(
+        (ThumbnailJob(
+            content_type=ContentType.objects.get_for_model(instance),
+            object_id=instance.pk) for instance in instances),
+        ignore_conflicts=True)
+
+
+def requeue_stale_jobs():
+    stale_before = timezone.now() - timedelta(
+        seconds=settings.THUMBNAIL_JOB_TIMEOUT)
+    return ThumbnailJob.objects.filter(
+        status=ThumbnailJob.PROCESSING, updated_at__lt=stale_before
+    ).update(status=ThumbnailJob.PENDING, updated_at=timezone.now())
+
+
+def claim_jobs(limit):
+    with transaction.atomic():
+        job_ids = list(
+            ThumbnailJob.objects.select_for_update(skip_locked=True)
+            .filter(status=ThumbnailJob.PENDING)
+            .order_by('pk').values_list('pk', flat=True)[:limit])
+        ThumbnailJob.objects.filter(pk__in=job_ids).update(
+            status=ThumbnailJob.PROCESSING, attempts=F('attempts') + 1,
+            updated_at=timezone.now())
+    return job_ids
+
+
+def process_job(job_id):
+    job = ThumbnailJob.objects.select_related('content_type').get(pk=job_id)
+    try:
+        instance = job.content_type.get_object_for_this_type(
+            pk=job.object_id)
+        if thumbnails_outdated(instance):
+            generate_thumbnails(instance)
+    except ObjectDoesNotExist:
+        job.status, job.error = ThumbnailJob.DONE, ''
+    except Exception as error:
+        job.error = repr(error)
+        job.status = (
+            ThumbnailJob.FAILED
+            if job.attempts >= settings.THUMBNAIL_JOB_MAX_ATTEMPTS
+            else ThumbnailJob.PENDING)
+    else:
+        job.status, job.error = ThumbnailJob.DONE, ''
+    try:
+        with transaction.atomic():
+            job.save(update_fields=('status', 'error', 'updated_at'))
+    except IntegrityError:
+        # Для объекта уже стоит в очереди новая задача, она и повторит
+        # генерацию.
+        job.status = ThumbnailJob.FAILED
+        job.save(update_fields=('status', 'error', 'updated_at'))
+    return job.status
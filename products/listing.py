@@ -0,0 +1,80 @@
+from django.db import transaction
+from django.dispatch import Signal
+
+from products.models import Product, ProductListing
+
+LISTING_FIELDS = ('name', 'slug', 'price', 'category', 'category_name',
+                  'subcategory', 'subcategory_name', 'image', 'thumbnails',
+                  'updated_at')
+BATCH_SIZE = 1000
+
+listings_rebuilt = Signal()
+
+
+def build_listing(product):
+    return ProductListing(
+        id=product.pk,
+        name=product.name,
+        slug=product.slug,
+        price=product.price,
+        category_id=product.category_id,
+        category_name=product.category.name,
+        subcategory_id=product.subcategory_id,
+        subcategory_name=product.subcategory.name,
+        image=product.image.name,
+        thumbnails=product.thumbnails,
+        updated_at=max(product.updated_at, product.category.updated_at,
+                       product.subcategory.updated_at),
+    )
+
+
+def _listing_products():
+    return Product.objects.select_related(
+        'category', 'subcategory').order_by('pk')
+
+
+def _save_listings(listings):
+    ProductListing.objects.bulk_create(
+        listings, batch_size=BATCH_SIZE, update_conflicts=True,
+        unique_fields=('id',), update_fields=LISTING_FIELDS)
+
+
+def refresh_listings(product_ids):
+    """Пересобирает строки каталога для указанных продуктов."""
+    _save_listings([build_listing(product) for product in
+                    _listing_products().filter(pk__in=product_ids)])
+
+
+def remove_listings(product_ids):
+    ProductListing.objects.filter(pk__in=product_ids).delete()
+
+
+def rename_category(category):
+    ProductListing.objects.filter(category_id=category.pk).update(
+        category_name=category.name, updated_at=category.updated_at)
+
+
+def rename_subcategory(subcategory):
+    ProductListing.objects.filter(subcategory_id=subcategory.pk).update(
+        subcategory_name=subcategory.name, updated_at=subcategory.updated_at)
+
+
+def update_listing_thumbnails(product):
+    ProductListing.objects.filter(pk=product.pk).update(
+        thumbnails=product.thumbnails, updated_at=product.updated_at)
+
+
+@transaction.atomic
+def rebuild_listings():
+    """Полностью пересобирает каталог из таблицы продуктов."""
+    listings = []
+    for product in _listing_products().iterator(chunk_size=BATCH_SIZE):
+        listings.append(build_listing(product))
+        if len(listings) == BATCH_SIZE:
+            _save_listings(listings)
+            listings = []
+    _save_listings(listings)
+    ProductListing.objects.exclude(
+        pk__in=Product.objects.values('pk')).delete()
+    listings_rebuilt.send(sender=ProductListing)
+    return ProductListing.objects.count()
@@ -0,0 +1,81 @@
+import random
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connections, router, transaction
+
+from products.models import Category, Product, Subcategory
+from products.search import rebuild_search_index, search_products
+
+WORDS = ('Сыр', 'Молоко', 'Чай', 'Кефир', 'Творог', 'Йогурт', 'Масло',
+         'Сливки', 'российский', 'голландский', 'чёрный', 'зелёный',
+         'Простоквашино', 'Greenfield', 'пастеризованное', 'фермерский')
+QUERIES = ('сыр', 'молоко прост', 'green', 'творог фермерский', 'йогурт')
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = ('Сравнивает поиск продуктов через индекс и через LIKE на '
+            'синтетическом каталоге. Данные удаляются после замера.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=int, nargs='+',
+                            default=[10000, 1000000],
+                            help='Размеры каталога')
+        parser.add_argument('--repeat', type=int, default=5,
+                            help='Сколько раз повторять каждый запрос')
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        for size in options['sizes']:
+            try:
+                with transaction.atomic(using=router.db_for_write(Product)):
+                    self.populate(size, random.Random(options['seed']))
+                    self.benchmark(size, options['repeat'])
+                    raise Rollback
+            except Rollback:
+                pass
+
+    def populate(self, size, rng):
+        category, = Category.objects.bulk_create([Category(
+            name='benchmark', slug='benchmark', image='products/чай.jpg')])
+        subcategory, = Subcategory.objects.bulk_create([Subcategory(
+            name='benchmark', slug='benchmark', category=category,
+            image='products/чай.jpg')])
+        batch = []
+        for number in range(size):
+            batch.append(Product(
+                name=f'{" ".join(rng.sample(WORDS, 3))} {number}',
+                slug=f'benchmark-{number}', price=1, category=category,
+                subcategory=subcategory, image='products/чай.jpg'))
+            if len(batch) == 10000:
+                Product.objects.bulk_create(batch)
+                batch = []
+        Product.objects.bulk_create(batch)
+        rebuild_search_index()
+        connection = connections[router.db_for_write(Product)]
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+
+    def measure(self, queryset, repeat):
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            queryset.count()
+            list(queryset[:5])
+            timings.append(time.perf_counter() - start)
+        return statistics.median(timings) * 1000
+
+    def benchmark(self, size, repeat):
+        self.stdout.write(f'Продуктов: {size}')
+        self.stdout.write(f'{"запрос":<20}{"LIKE, мс":>12}{"индекс, мс":>12}')
+        products = Product.objects.all()
+        for query in QUERIES:
+            like = self.measure(products.filter(name__icontains=query),
+                                repeat)
+            indexed = self.measure(search_products(products, query), repeat)
+            self.stdout.write(f'{query:<20}{like:>12.2f}{indexed:>12.2f}')
@@ -0,0 +1,128 @@
+import random
+import time
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand
+from django.db import connections, router
+
+from products.listing import rebuild_listings
+from products.models import CartObject, Category, Product, Subcategory
+from products.search import rebuild_search_index
+
+User = get_user_model()
+
+WORDS = ('Сыр', 'Молоко', 'Чай', 'Кефир', 'Творог', 'Йогурт', 'Масло',
+         'Сливки', 'российский', 'голландский', 'чёрный', 'зелёный',
+         'Простоквашино', 'Greenfield', 'пастеризованное', 'фермерский')
+IMAGES = ('products/молочные_продукты.jpg', 'products/чай.jpg',
+          'products/сыр.jpg', 'products/молоко.jpg', 'products/чай_чёрный.jpg',
+          'products/сыр_российский.jpg', 'products/сыр_голландский.jpg',
+          'products/молоко_простоквашино.jpg', 'products/чай_гринфилд.jpg')
+
+
+class Command(BaseCommand):
+    help = ('Заполняет базу синтетическим каталогом, пользователями и '
+            'корзинами для нагрузочных замеров. При одинаковых параметрах '
+            'и --seed данные получаются одинаковыми.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--categories', type=int, default=1000,
+                            help='Количество категорий')
+        parser.add_argument('--subcategories', type=int, default=5,
+                            help='Количество подкатегорий в категории')
+        parser.add_argument('--products', type=int, default=1000000,
+                            help='Количество продуктов')
+        parser.add_argument('--users', type=int, default=10000,
+                            help='Количество пользователей')
+        parser.add_argument('--cart-size', type=int, default=10,
+                            help='Количество продуктов в каждой корзине')
+        parser.add_argument('--password', default='benchmark',
+                            help='Пароль всех созданных пользователей')
+        parser.add_argument('--prefix', default='gen',
+                            help='Префикс адресов и имён создаваемых объектов')
+        parser.add_argument('--batch-size', type=int, default=10000)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        self.prefix = options['prefix']
+        self.batch_size = options['batch_size']
+        subcategories = self.timed('Категории и подкатегории',
+                                   self.create_categories, rng, **options)
+        product_ids = self.timed('Продукты', self.create_products, rng,
+                                 subcategories, options['products'])
+        users = self.timed('Пользователи', self.create_users,
+                           options['users'], options['password'])
+        self.timed('Корзины', self.create_carts, rng, users, product_ids,
+                   options['cart_size'])
+        self.timed('Каталог', rebuild_listings)
+        self.timed('Поисковый индекс', rebuild_search_index)
+        connection = connections[router.db_for_write(Product)]
+        with connection.cursor() as cursor:
+            self.timed('Статистика', cursor.execute, 'ANALYZE')
+
+    def timed(self, title, func, *args, **kwargs):
+        start = time.perf_counter()
+        result = func(*args, **kwargs)
+        count = len(result) if isinstance(result, list) else result
+        count = f': {count}' if isinstance(count, int) else ''
+        self.stdout.write(
+            f'{title}{count} за {time.perf_counter() - start:.1f} с')
+        return result
+
+    def create_categories(self, rng, **options):
+        categories = Category.objects.bulk_create(
+            (Category(name=f'Категория {self.prefix}-{number}',
+                      slug=f'{self.prefix}-{number}',
+                      image=rng.choice(IMAGES))
+             for number in range(options['categories'])),
+            batch_size=self.batch_size)
+        return Subcategory.objects.bulk_create(
+            (Subcategory(name=f'Подкатегория {category.slug}-{number}',
+                         slug=f'{category.slug}-{number}',
+                         category=category, image=rng.choice(IMAGES))
+             for category in categories
+             for number in range(options['subcategories'])),
+            batch_size=self.batch_size)
+
+    def create_products(self, rng, subcategories, size):
+        product_ids = []
+        batch = []
+        for number in range(size):
+            subcategory = rng.choice(subcategories)
+            slug = f'{self.prefix}-{number}'
+            batch.append(Product(
+                name=f'{" ".join(rng.sample(WORDS, 3))} {slug}', slug=slug,
+                price=Decimal(rng.randint(1, 999999)) / 100,
+                category_id=subcategory.category_id, subcategory=subcategory,
+                image=rng.choice(IMAGES)))
+            if len(batch) == self.batch_size:
+                product_ids.extend(self.bulk_create_products(batch))
+                batch = []
+        product_ids.extend(self.bulk_create_products(batch))
+        return product_ids
+
+    def bulk_create_products(self, batch):
+        return [product.pk for product in Product.objects.bulk_create(batch)]
+
+    def create_users(self, size, password):
+        # Хеш пароля дорогой, поэтому он один на всех пользователей.
+        password = make_password(password)
+        return User.objects.bulk_create(
+            (User(username=f'{self.prefix}-{number}',
+                  email=f'{self.prefix}-{number}@example.com',
+                  password=password)
+             for number in range(size)),
+            batch_size=self.batch_size)
+
+    def create_carts(self, rng, users, product_ids, cart_size):
+        cart_size = min(cart_size, len(product_ids))
+        CartObject.objects.bulk_create(
+            (CartObject(user=user, product_id=product_id,
+                        amount=rng.randint(1, 5))
+             for user in users
+             for product_id in rng.sample(product_ids, cart_size)),
+            batch_size=self.batch_size)
+        return len(users) * cart_size
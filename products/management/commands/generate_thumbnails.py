@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand
+
+from products.jobs import enqueue_thumbnails
+from products.models import Category, Product, Subcategory
+from products.thumbnails import generate_thumbnails, thumbnails_outdated
+
+
+class Command(BaseCommand):
+    help = ('Ставит в очередь генерацию миниатюр для уже загруженных '
+            'изображений')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--force', action='store_true',
+            help='Пересоздать миниатюры, даже если они актуальны')
+        parser.add_argument(
+            '--sync', action='store_true',
+            help='Сгенерировать миниатюры сразу, без очереди')
+
+    def handle(self, *args, **options):
+        for model in (Category, Subcategory, Product):
+            generated = 0
+            if options['force'] and not options['sync']:
+                model.objects.update(thumbnails={})
+            for instance in model.objects.order_by('pk').iterator():
+                if options['force'] or thumbnails_outdated(instance):
+                    if options['sync']:
+                        generate_thumbnails(instance)
+                    else:
+                        enqueue_thumbnails(instance)
+                    generated += 1
+            self.stdout.write(
+                f'{model._meta.verbose_name_plural}: {generated}')
@@ -0,0 +1,61 @@
+import csv
+import resource
+import sys
+import time
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import IntegrityError
+
+from products.importer import READERS, CatalogImporter
+
+
+class Command(BaseCommand):
+    help = ('Загружает продукты из CSV или JSONL пачками, обновляя '
+            'существующие по slug. Поля: name, slug, price, category '
+            '(slug, можно не указывать), subcategory (slug), image (путь в '
+            'хранилище медиафайлов). Категории и подкатегории должны уже '
+            'существовать.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Файл или - для чтения из stdin')
+        parser.add_argument('--format', choices=READERS,
+                            help='Формат файла; по умолчанию по расширению')
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--no-copy', action='store_true',
+                            help='Не использовать COPY в PostgreSQL')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        file_format = options['format'] or Path(path).suffix.lstrip('.')
+        if file_format not in READERS:
+            raise CommandError('Укажите формат файла: --format csv или jsonl')
+        importer = CatalogImporter(
+            batch_size=options['batch_size'],
+            use_copy=False if options['no_copy'] else None)
+        start = time.perf_counter()
+        try:
+            if path == '-':
+                self.run(importer, READERS[file_format](sys.stdin), start)
+            else:
+                with open(path, newline='', encoding='utf-8-sig') as file:
+                    self.run(importer, READERS[file_format](file), start)
+        except (IntegrityError, ValueError, csv.Error) as error:
+            # Сохранённые пачки остаются в базе, текущая откатывается.
+            raise CommandError(
+                f'Импорт остановлен после {importer.read} строк: {error}')
+        for error in importer.errors:
+            self.stderr.write(error)
+        self.stdout.write(self.style.SUCCESS(
+            f'Создано {importer.created}, обновлено {importer.updated}, '
+            f'пропущено {importer.skipped} за '
+            f'{time.perf_counter() - start:.1f} с'))
+
+    def run(self, importer, rows, start):
+        for read in importer.import_rows(rows):
+            elapsed = time.perf_counter() - start
+            # ru_maxrss в Linux — в килобайтах.
+            memory = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            self.stdout.write(
+                f'{read} строк, {read / elapsed:.0f} строк/с, '
+                f'память {memory / 1024:.0f} МБ')
@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+
+from products.listing import rebuild_listings
+
+
+class Command(BaseCommand):
+    help = 'Пересобирает денормализованный каталог продуктов'
+
+    def handle(self, *args, **options):
+        self.stdout.write(f'Продуктов в каталоге: {rebuild_listings()}')
@@ -0,0 +1,45 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from products.jobs import claim_jobs, process_job, requeue_stale_jobs
+
+
+class Command(BaseCommand):
+    help = 'Обрабатывает очередь задач генерации миниатюр'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=os.cpu_count(),
+                            help='Количество процессов-обработчиков')
+        parser.add_argument('--batch', type=int, default=50,
+                            help='Сколько задач забирать из очереди за раз')
+        parser.add_argument('--poll-interval', type=float, default=2.0,
+                            help='Пауза между опросами пустой очереди, с')
+        parser.add_argument('--once', action='store_true',
+                            help='Выйти, когда очередь опустеет')
+
+    def handle(self, *args, **options):
+        # Дочерние процессы не должны наследовать соединения с БД
+        # родительского процесса.
+        connections.close_all()
+        with ProcessPoolExecutor(max_workers=options['processes']) as pool:
+            while True:
+                requeue_stale_jobs()
+                job_ids = claim_jobs(options['batch'])
+                connections.close_all()
+                if not job_ids:
+                    if options['once']:
+                        return
+                    time.sleep(options['poll_interval'])
+                    continue
+                futures = {pool.submit(process_job, job_id): job_id
+                           for job_id in job_ids}
+                for future in as_completed(futures):
+                    try:
+                        self.stdout.write(
+                            f'{futures[future]}: {future.result()}')
+                    except Exception as error:
+                        self.stderr.write(f'{futures[future]}: {error!r}')
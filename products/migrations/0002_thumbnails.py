@@ -0,0 +1,28 @@
+# Generated by Django 4.2 on 2026-10-18 16:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='category',
+            name='thumbnails',
+            field=models.JSONField(blank=True, default=dict, editable=False, verbose_name='Миниатюры'),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='thumbnails',
+            field=models.JSONField(blank=True, default=dict, editable=False, verbose_name='Миниатюры'),
+        ),
+        migrations.AddField(
+            model_name='subcategory',
+            name='thumbnails',
+            field=models.JSONField(blank=True, default=dict, editable=False, verbose_name='Миниатюры'),
+        ),
+    ]
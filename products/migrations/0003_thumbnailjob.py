@@ -0,0 +1,41 @@
+# Generated by Django 4.2 on 2026-10-18 16:38
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contenttypes', '0002_remove_content_type_name'),
+        ('products', '0002_thumbnails'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ThumbnailJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('object_id', models.PositiveBigIntegerField()),
+                ('status', models.CharField(choices=[('pending', 'В очереди'), ('processing', 'Обрабатывается'), ('done', 'Готово'), ('failed', 'Ошибка')], default='pending', max_length=16, verbose_name='Статус')),
+                ('attempts', models.PositiveSmallIntegerField(default=0, verbose_name='Попытки')),
+                ('error', models.TextField(blank=True, verbose_name='Ошибка')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('content_type', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='contenttypes.contenttype')),
+            ],
+            options={
+                'verbose_name': 'Задача генерации миниатюр',
+                'verbose_name_plural': 'Задачи генерации миниатюр',
+                'ordering': ('pk',),
+            },
+        ),
+        migrations.AddIndex(
+            model_name='thumbnailjob',
+            index=models.Index(fields=['status', 'id'], name='products_th_status_2a725c_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='thumbnailjob',
+            constraint=models.UniqueConstraint(condition=models.Q(('status', 'pending')), fields=('content_type', 'object_id'), name='unique_pending_thumbnail_job'),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 4.2 on 2026-10-18 17:02
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0003_thumbnailjob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='category',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now, verbose_name='Изменено'),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now, verbose_name='Изменено'),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='subcategory',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now, verbose_name='Изменено'),
+            preserve_default=False,
+        ),
+    ]
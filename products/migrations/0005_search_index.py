@@ -0,0 +1,52 @@
+from django.contrib.postgres.indexes import GinIndex, OpClass
+from django.contrib.postgres.search import SearchVector
+from django.db import migrations
+from django.db.models.functions import Upper
+
+FTS_TABLE = 'products_product_fts'
+
+
+def postgresql_indexes():
+    return (
+        GinIndex(SearchVector('name', config='russian'),
+                 name='product_name_tsvector_idx'),
+        GinIndex(OpClass(Upper('name'), name='gin_trgm_ops'),
+                 name='product_name_trgm_idx'),
+    )
+
+
+def create_search_index(apps, schema_editor):
+    Product = apps.get_model('products', 'Product')
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+        for index in postgresql_indexes():
+            schema_editor.add_index(Product, index)
+    elif vendor == 'sqlite':
+        schema_editor.execute(
+            f"CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5("
+            f"name, tokenize='unicode61 remove_diacritics 2')")
+        schema_editor.execute(
+            f'INSERT INTO {FTS_TABLE} (rowid, name) '
+            f'SELECT id, name FROM {Product._meta.db_table}')
+
+
+def drop_search_index(apps, schema_editor):
+    Product = apps.get_model('products', 'Product')
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        for index in postgresql_indexes():
+            schema_editor.remove_index(Product, index)
+    elif vendor == 'sqlite':
+        schema_editor.execute(f'DROP TABLE {FTS_TABLE}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0004_updated_at'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
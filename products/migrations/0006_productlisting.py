@@ -0,0 +1,88 @@
+# Generated by Django 4.2 on 2026-10-18 16:49
+
+from django.contrib.postgres.indexes import GinIndex, OpClass
+from django.contrib.postgres.search import SearchVector
+from django.db import migrations, models
+from django.db.models.functions import Upper
+import django.db.models.deletion
+
+
+def postgresql_indexes():
+    return (
+        GinIndex(SearchVector('name', config='russian'),
+                 name='listing_name_tsvector_idx'),
+        GinIndex(OpClass(Upper('name'), name='gin_trgm_ops'),
+                 name='listing_name_trgm_idx'),
+    )
+
+
+def fill_listing(apps, schema_editor):
+    Product = apps.get_model('products', 'Product')
+    ProductListing = apps.get_model('products', 'ProductListing')
+    if schema_editor.connection.vendor == 'postgresql':
+        for index in postgresql_indexes():
+            schema_editor.add_index(ProductListing, index)
+    products = Product.objects.select_related('category', 'subcategory')
+    ProductListing.objects.bulk_create(
+        (ProductListing(
+            id=product.pk,
+            name=product.name,
+            slug=product.slug,
+            price=product.price,
+            category_id=product.category_id,
+            category_name=product.category.name,
+            subcategory_id=product.subcategory_id,
+            subcategory_name=product.subcategory.name,
+            image=product.image.name,
+            thumbnails=product.thumbnails,
+            updated_at=max(product.updated_at, product.category.updated_at,
+                           product.subcategory.updated_at))
+         for product in products.iterator(chunk_size=1000)),
+        batch_size=1000)
+
+
+def drop_postgresql_indexes(apps, schema_editor):
+    ProductListing = apps.get_model('products', 'ProductListing')
+    if schema_editor.connection.vendor == 'postgresql':
+        for index in postgresql_indexes():
+            schema_editor.remove_index(ProductListing, index)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0005_search_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductListing',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('name', models.CharField(max_length=256, verbose_name='Название')),
+                ('slug', models.SlugField(verbose_name='Адрес')),
+                ('price', models.DecimalField(decimal_places=2, max_digits=6, verbose_name='Цена')),
+                ('category_name', models.CharField(max_length=256)),
+                ('subcategory_name', models.CharField(max_length=256)),
+                ('image', models.ImageField(upload_to='products/')),
+                ('thumbnails', models.JSONField(default=dict)),
+                ('updated_at', models.DateTimeField(db_index=True)),
+                ('category', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='products.category', verbose_name='Категория')),
+                ('subcategory', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='products.subcategory', verbose_name='Подкатегория')),
+            ],
+            options={
+                'verbose_name': 'Продукт в каталоге',
+                'verbose_name_plural': 'Каталог продуктов',
+                'ordering': ('category_name', 'id'),
+            },
+        ),
+        migrations.AddIndex(
+            model_name='productlisting',
+            index=models.Index(fields=['category_name', 'id'], name='listing_ordering_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='productlisting',
+            index=models.Index(fields=['category', 'subcategory', 'id'], name='listing_keyset_idx'),
+        ),
+        migrations.RunPython(fill_listing, drop_postgresql_indexes),
+    ]
@@ -0,0 +1,60 @@
+# Generated by Django 4.2 on 2026-10-18 17:02
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('products', '0006_productlisting'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='product',
+            options={'ordering': ('category_id', 'subcategory_id', 'id'), 'verbose_name': 'Продукт', 'verbose_name_plural': 'Продукты'},
+        ),
+        migrations.AddIndex(
+            model_name='cartobject',
+            index=models.Index(fields=['user', '-id'], name='cart_user_recent_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['category', 'subcategory', 'id'], name='product_ordering_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='productlisting',
+            index=models.Index(fields=['category', 'category_name', 'id'], name='listing_category_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='productlisting',
+            index=models.Index(fields=['subcategory', 'category_name', 'id'], name='listing_subcategory_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='productlisting',
+            index=models.Index(fields=['subcategory', 'category', 'id'], name='listing_sub_keyset_idx'),
+        ),
+        migrations.AlterField(
+            model_name='cartobject',
+            name='user',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='cart_of', to=settings.AUTH_USER_MODEL, verbose_name='Пользователь'),
+        ),
+        migrations.AlterField(
+            model_name='product',
+            name='category',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.PROTECT, related_name='products', to='products.category', verbose_name='Категория'),
+        ),
+        migrations.AlterField(
+            model_name='productlisting',
+            name='category',
+            field=models.ForeignKey(db_constraint=False, db_index=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='products.category', verbose_name='Категория'),
+        ),
+        migrations.AlterField(
+            model_name='productlisting',
+            name='subcategory',
+            field=models.ForeignKey(db_constraint=False, db_index=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='products.subcategory', verbose_name='Подкатегория'),
+        ),
+    ]
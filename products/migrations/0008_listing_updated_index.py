@@ -0,0 +1,22 @@
+# Generated by Django 4.2 on 2026-10-18 17:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0007_query_indexes'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='productlisting',
+            name='updated_at',
+            field=models.DateTimeField(),
+        ),
+        migrations.AddIndex(
+            model_name='productlisting',
+            index=models.Index(fields=['updated_at', 'id'], name='listing_updated_idx'),
+        ),
+    ]
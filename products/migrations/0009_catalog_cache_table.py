@@ -0,0 +1,20 @@
+from django.core.management import call_command
+from django.db import migrations
+
+
+def create_cache_tables(apps, schema_editor):
+    # Кеш каталога по умолчанию хранится в базе, чтобы сброс версии
+    # каталога видели все процессы: web, asgi, worker и команды.
+    call_command('createcachetable',
+                 database=schema_editor.connection.alias, verbosity=0)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0008_listing_updated_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_cache_tables, migrations.RunPython.noop),
+    ]
@@ -1,6 +1,7 @@
 from decimal import Decimal
 
 from django.contrib.auth import get_user_model
+from django.contrib.contenttypes.models import ContentType
 from django.core.validators import MinValueValidator
 from django.db import models
 from smart_selects.db_fields import ChainedForeignKey
@@ -12,6 +13,9 @@ class Category(models.Model):
     name = models.CharField(unique=True, verbose_name='Название', max_length=256)
     slug = models.SlugField(unique=True, verbose_name='Адрес')
     image = models.ImageField(upload_to='products/',)
+    thumbnails = models.JSONField(default=dict, blank=True, editable=False,
+                                  verbose_name='Миниатюры')
+    updated_at = models.DateTimeField(auto_now=True, verbose_name='Изменено')
 
     class Meta:
         verbose_name = 'Категория'
@@ -30,6 +34,9 @@ class Subcategory(models.Model):
                                  on_delete=models.PROTECT,
                                  verbose_name='Категория')
     image = models.ImageField(upload_to='products/',)
+    thumbnails = models.JSONField(default=dict, blank=True, editable=False,
+                                  verbose_name='Миниатюры')
+    updated_at = models.DateTimeField(auto_now=True, verbose_name='Изменено')
 
     class Meta:
         verbose_name = 'Подкатегория'
@@ -49,7 +56,11 @@ class Product(models.Model):
                                     limit_value=Decimal('0.01'),
                                     message='Цена не может быть меньше 1 коп'),
                                     ))
-    category = models.ForeignKey(Category, related_name='products', on_delete=models.PROTECT, verbose_name='Категория')
+    category = models.ForeignKey(Category,
+                                 related_name='products',
+                                 on_delete=models.PROTECT,
+                                 verbose_name='Категория',
+                                 db_index=False)
     subcategory = ChainedForeignKey(Subcategory,
                                     chained_field='category',
                                     chained_model_field='category',
@@ -60,12 +71,20 @@ class Product(models.Model):
                                     on_delete=models.PROTECT,
                                     verbose_name='Подкатегория')
     image = models.ImageField(upload_to='products/',)
+    thumbnails = models.JSONField(default=dict, blank=True, editable=False,
+                                  verbose_name='Миниатюры')
+    updated_at = models.DateTimeField(auto_now=True, verbose_name='Изменено')
 
 
     class Meta:
         verbose_name = 'Продукт'
         verbose_name_plural = 'Продукты'
-        ordering = ('subcategory__category', 'subcategory')
+        # Сортировка по полям самого продукта, без соединения с категориями.
+        ordering = ('category_id', 'subcategory_id', 'id')
+        indexes = (
+            models.Index(fields=('category', 'subcategory', 'id'),
+                         name='product_ordering_idx'),
+        )
 
     def __str__(self):
         return self.name
@@ -74,7 +93,8 @@ class Product(models.Model):
 class CartObject(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE,
                              related_name='cart_of',
-                             verbose_name='Пользователь')
+                             verbose_name='Пользователь',
+                             db_index=False)
     product = models.ForeignKey(Product, on_delete=models.CASCADE,
                                 related_name='cart',
                                 verbose_name='Продукт')
@@ -88,4 +108,83 @@ class CartObject(models.Model):
         constraints = (
             models.UniqueConstraint(
                 fields=('user', 'product'), name='unique_user_product'),)
+        indexes = (
+            models.Index(fields=('user', '-id'), name='cart_user_recent_idx'),
+        )
         ordering = ('-pk',)
+
+
+class ThumbnailJob(models.Model):
+    PENDING = 'pending'
+    PROCESSING = 'processing'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUSES = ((PENDING, 'В очереди'), (PROCESSING, 'Обрабатывается'),
+                (DONE, 'Готово'), (FAILED, 'Ошибка'))
+
+    content_type = models.ForeignKey(ContentType, on_delete=models.CASCADE)
+    object_id = models.PositiveBigIntegerField()
+    status = models.CharField(max_length=16, choices=STATUSES,
+                              default=PENDING, verbose_name='Статус')
+    attempts = models.PositiveSmallIntegerField(default=0,
+                                                verbose_name='Попытки')
+    error = models.TextField(blank=True, verbose_name='Ошибка')
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = 'Задача генерации миниатюр'
+        verbose_name_plural = 'Задачи генерации миниатюр'
+        constraints = (
+            models.UniqueConstraint(
+                fields=('content_type', 'object_id'),
+                condition=models.Q(status='pending'),
+                name='unique_pending_thumbnail_job'),)
+        indexes = (models.Index(fields=('status', 'id')),)
+        ordering = ('pk',)
+
+
+class ProductListing(models.Model):
+    id = models.BigIntegerField(primary_key=True)
+    name = models.CharField(max_length=256, verbose_name='Название')
+    slug = models.SlugField(verbose_name='Адрес')
+    price = models.DecimalField(max_digits=6, decimal_places=2,
+                                verbose_name='Цена')
+    category = models.ForeignKey(Category, on_delete=models.DO_NOTHING,
+                                 db_constraint=False, db_index=False,
+                                 related_name='+', verbose_name='Категория')
+    category_name = models.CharField(max_length=256)
+    subcategory = models.ForeignKey(Subcategory, on_delete=models.DO_NOTHING,
+                                    db_constraint=False, db_index=False,
+                                    related_name='+',
+                                    verbose_name='Подкатегория')
+    subcategory_name = models.CharField(max_length=256)
+    image = models.ImageField(upload_to='products/')
+    thumbnails = models.JSONField(default=dict)
+    updated_at = models.DateTimeField()
+
+    class Meta:
+        verbose_name = 'Продукт в каталоге'
+        verbose_name_plural = 'Каталог продуктов'
+        ordering = ('category_name', 'id')
+        # Для каждого фильтра API (без фильтра, по категории, по
+        # подкатегории) — индекс в порядке выдачи постранично по номеру
+        # (category_name, id) и по курсору (category, subcategory, id).
+        indexes = (
+            models.Index(fields=('category_name', 'id'),
+                         name='listing_ordering_idx'),
+            models.Index(fields=('category', 'subcategory', 'id'),
+                         name='listing_keyset_idx'),
+            models.Index(fields=('category', 'category_name', 'id'),
+                         name='listing_category_idx'),
+            models.Index(fields=('subcategory', 'category_name', 'id'),
+                         name='listing_subcategory_idx'),
+            models.Index(fields=('subcategory', 'category', 'id'),
+                         name='listing_sub_keyset_idx'),
+            # Выгрузка каталога по времени изменения.
+            models.Index(fields=('updated_at', 'id'),
+                         name='listing_updated_idx'),
+        )
+
+    def __str__(self):
+        return self.name
@@ -0,0 +1,93 @@
+import re
+
+from django.db import connections, router
+
+from products.models import Product
+
+FTS_TABLE = 'products_product_fts'
+SEARCH_CONFIG = 'russian'
+
+
+def search_products(queryset, query):
+    """Ищет продукты по названию и сортирует по релевантности.
+
+    PostgreSQL использует GIN-индексы по tsvector и триграммам, SQLite —
+    таблицу FTS5, остальные СУБД — обычный LIKE.
+    """
+    vendor = connections[queryset.db].vendor
+    if vendor == 'postgresql':
+        return _search_postgresql(queryset, query)
+    if vendor == 'sqlite':
+        return _search_sqlite(queryset, query)
+    return queryset.filter(name__icontains=query)
+
+
+def _search_postgresql(queryset, query):
+    from django.contrib.postgres.search import (SearchQuery, SearchRank,
+                                                SearchVector,
+                                                TrigramSimilarity)
+    from django.db.models import Q
+
+    vector = SearchVector('name', config=SEARCH_CONFIG)
+    search_query = SearchQuery(query, config=SEARCH_CONFIG,
+                               search_type='websearch')
+    return queryset.annotate(
+        search=vector,
+        rank=(SearchRank(vector, search_query)
+              + TrigramSimilarity('name', query)),
+    ).filter(
+        Q(search=search_query) | Q(name__icontains=query)
+    ).order_by('-rank', 'pk')
+
+
+def _search_sqlite(queryset, query):
+    words = re.findall(r'\w+', query)
+    if not words:
+        return queryset.filter(name__icontains=query)
+    table = queryset.model._meta.db_table
+    pk_column = queryset.model._meta.pk.column
+    return queryset.extra(
+        tables=[FTS_TABLE],
+        where=[f'{FTS_TABLE}.rowid = {table}.{pk_column}',
+               f'{FTS_TABLE} MATCH %s'],
+        params=[' '.join(f'"{word}"*' for word in words)],
+        select={'rank': f'bm25({FTS_TABLE})'},
+    ).order_by('rank', 'pk')
+
+
+def _sqlite_cursor():
+    connection = connections[router.db_for_write(Product)]
+    if connection.vendor != 'sqlite':
+        return None
+    return connection.cursor()
+
+
+def index_products(products):
+    cursor = _sqlite_cursor()
+    if cursor is None:
+        return
+    with cursor:
+        cursor.executemany(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s',
+                           [(product.pk,) for product in products])
+        cursor.executemany(
+            f'INSERT INTO {FTS_TABLE} (rowid, name) VALUES (%s, %s)',
+            [(product.pk, product.name) for product in products])
+
+
+def unindex_products(product_ids):
+    cursor = _sqlite_cursor()
+    if cursor is None:
+        return
+    with cursor:
+        cursor.executemany(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s',
+                           [(pk,) for pk in product_ids])
+
+
+def rebuild_search_index():
+    cursor = _sqlite_cursor()
+    if cursor is None:
+        return
+    with cursor:
+        cursor.execute(f'DELETE FROM {FTS_TABLE}')
+        cursor.execute(f'INSERT INTO {FTS_TABLE} (rowid, name) '
+                       f'SELECT id, name FROM {Product._meta.db_table}')
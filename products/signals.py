@@ -0,0 +1,71 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from products.chaining import invalidate_subcategories
+from products.importer import products_imported
+from products.jobs import enqueue_many_thumbnails, enqueue_thumbnails
+from products.listing import (refresh_listings, remove_listings,
+                              rename_category, rename_subcategory,
+                              update_listing_thumbnails)
+from products.models import Category, Product, Subcategory
+from products.search import index_products, unindex_products
+from products.thumbnails import thumbnails_generated, thumbnails_outdated
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_save, sender=Subcategory)
+@receiver(post_save, sender=Product)
+def update_thumbnails(sender, instance, raw, **kwargs):
+    if raw or not thumbnails_outdated(instance):
+        return
+    enqueue_thumbnails(instance)
+
+
+@receiver(post_save, sender=Subcategory)
+@receiver(post_delete, sender=Subcategory)
+def update_chained_subcategories(sender, **kwargs):
+    transaction.on_commit(invalidate_subcategories)
+
+
+@receiver(post_save, sender=Product)
+def update_search_index(sender, instance, **kwargs):
+    index_products([instance])
+
+
+@receiver(post_delete, sender=Product)
+def remove_from_search_index(sender, instance, **kwargs):
+    unindex_products([instance.pk])
+
+
+@receiver(post_save, sender=Product)
+def update_listing(sender, instance, **kwargs):
+    refresh_listings([instance.pk])
+
+
+@receiver(post_delete, sender=Product)
+def remove_from_listing(sender, instance, **kwargs):
+    remove_listings([instance.pk])
+
+
+@receiver(post_save, sender=Category)
+def update_listing_category(sender, instance, **kwargs):
+    rename_category(instance)
+
+
+@receiver(post_save, sender=Subcategory)
+def update_listing_subcategory(sender, instance, **kwargs):
+    rename_subcategory(instance)
+
+
+@receiver(products_imported, sender=Product)
+def update_imported_products(sender, products, **kwargs):
+    enqueue_many_thumbnails(
+        product for product in products if thumbnails_outdated(product))
+    index_products(products)
+    refresh_listings([product.pk for product in products])
+
+
+@receiver(thumbnails_generated, sender=Product)
+def update_listing_images(sender, instance, **kwargs):
+    update_listing_thumbnails(instance)
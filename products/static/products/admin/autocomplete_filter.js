@@ -0,0 +1,14 @@
+'use strict';
+{
+    const $ = django.jQuery;
+
+    // Выбор в фильтре с автодополнением сразу применяет фильтр,
+    // очистка поля — снимает его.
+    $(document).on('change', '[data-query-string]', function() {
+        const url = new URL(this.dataset.queryString, window.location.href);
+        if (this.value) {
+            url.searchParams.set(this.name, this.value);
+        }
+        window.location.search = url.search;
+    });
+}
@@ -0,0 +1,134 @@
+import io
+import json
+from decimal import Decimal
+from unittest import mock
+
+from django.core.cache import caches
+from django.test import TestCase, override_settings
+
+from products.chaining import VERSION_KEY
+from products.importer import CatalogImporter, read_csv, read_jsonl
+from products.models import Category, Product, Subcategory
+
+
+class CatalogImporterTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        category = Category.objects.create(
+            name='Молочные продукты', slug='dairy',
+            image='products/сыр.jpg')
+        Subcategory.objects.create(
+            name='Сыры', slug='cheese', category=category,
+            image='products/сыр.jpg')
+        Product.objects.create(
+            name='Сыр российский', slug='russian', price='10.50',
+            category=category, subcategory=category.subcategories.get(),
+            image='products/сыр.jpg')
+
+    def import_rows(self, rows, batch_size=5000):
+        importer = CatalogImporter(batch_size=batch_size)
+        for _ in importer.import_rows(rows):
+            pass
+        return importer
+
+    def product(self, slug, name, price='1.00'):
+        return {'name': name, 'slug': slug, 'price': price,
+                'subcategory': 'cheese', 'image': 'products/сыр.jpg'}
+
+    def test_malformed_jsonl(self):
+        lines = [json.dumps(self.product('gouda', 'Гауда')), '{"name": ',
+                 json.dumps(self.product('brie', 'Бри'))]
+        importer = self.import_rows(read_jsonl(io.StringIO(
+            '\n'.join(lines))))
+        self.assertEqual((importer.created, importer.skipped), (2, 1))
+        self.assertIn('строка 2: неверный JSON', importer.errors[0])
+
+    def test_duplicate_names(self):
+        importer = self.import_rows([
+            # Название уже у продукта в базе.
+            self.product('other', 'Сыр российский'),
+            self.product('gouda', 'Гауда'),
+            # Название уже у другой строки пачки.
+            self.product('gouda-2', 'Гауда'),
+            # Переименование существующего продукта и повтор slug.
+            self.product('russian', 'Российский', '12.00'),
+            self.product('brie', 'Бри'),
+            self.product('brie', 'Бри фермерский'),
+        ], batch_size=3)
+        self.assertEqual(
+            (importer.created, importer.updated, importer.skipped),
+            (2, 1, 2))
+        self.assertEqual(
+            dict(Product.objects.values_list('slug', 'name')),
+            {'russian': 'Российский', 'gouda': 'Гауда',
+             'brie': 'Бри фермерский'})
+
+    def test_csv(self):
+        file = io.StringIO(
+            'name,slug,price,category,subcategory,image\n'
+            'Гауда,gouda,"5,5",dairy,cheese,products/сыр.jpg\n'
+            'Бри,brie,5,milk,cheese,products/сыр.jpg\n')
+        importer = self.import_rows(read_csv(file))
+        self.assertEqual((importer.created, importer.skipped), (1, 1))
+        self.assertEqual(Product.objects.get(slug='gouda').price,
+                         Decimal('5.50'))
+
+
+@override_settings(CHAINING_CACHE='default')
+class ChainedSubcategoriesTests(TestCase):
+    """Подкатегории для выбора в админке: кеш, сброс и 304."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.dairy = Category.objects.create(
+            name='Молочные продукты', slug='dairy',
+            image='products/сыр.jpg')
+        cls.bakery = Category.objects.create(
+            name='Выпечка', slug='bakery', image='products/сыр.jpg')
+        cls.cheese = Subcategory.objects.create(
+            name='Сыры', slug='cheese', category=cls.dairy,
+            image='products/сыр.jpg')
+
+    def setUp(self):
+        caches['default'].clear()
+
+    def get(self, category, queries, status=200, **headers):
+        path = ('/chaining/filter/products/Subcategory/category/products/'
+                f'Product/subcategory/{category.pk}/')
+        with self.assertNumQueries(queries):
+            response = self.client.get(path, **headers)
+        self.assertEqual(response.status_code, status)
+        return response
+
+    def test_cache(self):
+        self.assertEqual(self.get(self.dairy, 1).json(),
+                         [{'value': self.cheese.pk, 'display': 'Сыры'}])
+        # Карта кешируется целиком, в том числе для пустых категорий.
+        self.assertEqual(self.get(self.bakery, 0).json(), [])
+        self.get(self.dairy, 0)
+
+    def test_invalidation(self):
+        self.get(self.dairy, 1)
+        cache = caches['default']
+        # Версия не должна истекать вместе с записями кеша.
+        with mock.patch.object(cache, 'default_timeout', -1), \
+                self.captureOnCommitCallbacks(execute=True):
+            self.cheese.name = 'Твёрдые сыры'
+            self.cheese.save()
+        self.assertEqual(self.get(self.dairy, 1).json(),
+                         [{'value': self.cheese.pk,
+                           'display': 'Твёрдые сыры'}])
+        # Пропавшая версия заводится заново и не совпадает с прежними,
+        # иначе снова нашлась бы карта со старым названием.
+        cache.delete(VERSION_KEY)
+        self.get(self.dairy, 1)
+
+    def test_not_modified(self):
+        etag = self.get(self.dairy, 1)['ETag']
+        self.get(self.dairy, 0, 304, HTTP_IF_NONE_MATCH=etag)
+        self.assertNotEqual(self.get(self.bakery, 0)['ETag'], etag)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.cheese.save()
+        response = self.get(self.dairy, 1, HTTP_IF_NONE_MATCH=etag)
+        self.assertNotEqual(response['ETag'], etag)
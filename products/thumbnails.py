@@ -0,0 +1,53 @@
+from django.conf import settings
+from django.dispatch import Signal
+from django.utils import timezone
+from sorl.thumbnail import get_thumbnail
+
+from store.instrumentation import timed
+
+thumbnails_generated = Signal()
+
+
+def build_thumbnails(image):
+    return {'source': image.name,
+            'sizes': {size: get_thumbnail(image, size).url
+                      for size in settings.IMAGE_VARIANT_SIZES}}
+
+
+def _outdated(thumbnails, image_name):
+    thumbnails = thumbnails or {}
+    sizes = thumbnails.get('sizes', {})
+    return (thumbnails.get('source') != image_name
+            or any(size not in sizes
+                   for size in settings.IMAGE_VARIANT_SIZES))
+
+
+def thumbnails_outdated(instance):
+    return _outdated(instance.thumbnails, instance.image.name)
+
+
+def generate_thumbnails(instance):
+    thumbnails = build_thumbnails(instance.image) if instance.image else {}
+    updated_at = timezone.now()
+    type(instance).objects.filter(pk=instance.pk).update(
+        thumbnails=thumbnails, updated_at=updated_at)
+    instance.thumbnails, instance.updated_at = thumbnails, updated_at
+    thumbnails_generated.send(sender=type(instance), instance=instance)
+    return thumbnails
+
+
+@timed('thumbnails')
+def get_thumbnail_urls(instance):
+    if thumbnails_outdated(instance):
+        return [instance.image.url] * len(settings.IMAGE_VARIANT_SIZES)
+    sizes = instance.thumbnails['sizes']
+    return [sizes[size] for size in settings.IMAGE_VARIANT_SIZES]
+
+
+@timed('thumbnails')
+def get_variant_urls(thumbnails, image_name, storage):
+    """То же, что get_thumbnail_urls, но по значениям из .values()."""
+    if _outdated(thumbnails, image_name):
+        return [storage.url(image_name)] * len(settings.IMAGE_VARIANT_SIZES)
+    sizes = thumbnails['sizes']
+    return [sizes[size] for size in settings.IMAGE_VARIANT_SIZES]
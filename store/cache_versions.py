@@ -0,0 +1,37 @@
+import time
+
+
+def _new_version(previous=0):
+    # Версия растёт вместе со временем: если ключ пропал из кеша
+    # (clear(), вытеснение при MAX_ENTRIES), новая версия всё равно больше
+    # всех прежних, и старые записи и ETag по ней не найдутся.
+    return max(time.time_ns(), previous + 1)
+
+
+def get_version(cache, key):
+    """Текущая версия набора данных в кеше; заводит её при первом
+    обращении."""
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, _new_version(), timeout=None)
+        version = cache.get(key)
+    return version
+
+
+def bump_version(cache, key):
+    """Меняет версию набора данных, все записи со старой версией
+    становятся недоступны.
+
+    Без incr(): у BaseCache (в том числе DatabaseCache) он перезаписывает
+    ключ со сроком TIMEOUT по умолчанию, и версия истекала бы.
+    """
+    cache.set(key, _new_version(cache.get(key) or 0), timeout=None)
+
+
+def get_version_timestamp(version):
+    """Время последней смены версии в секундах — для Last-Modified.
+
+    Версия не меньше времени смены в наносекундах; после сброса кеша она
+    показывает время сброса, то есть только позже настоящего.
+    """
+    return version // 10 ** 9
@@ -0,0 +1,73 @@
+import time
+from functools import partial
+
+from django.db import DEFAULT_DB_ALIAS
+from django.db.backends.postgresql import base
+
+from store.db.pool import PoolTimeout, get_pool
+
+
+class PooledDatabase:
+    """Модуль драйвера, у которого connect() берёт соединение из пула."""
+
+    def __init__(self, database, pool, health_checks):
+        self.database = database
+        self.pool = pool
+        self.health_checks = health_checks
+
+    def __getattr__(self, name):
+        return getattr(self.database, name)
+
+    def connect(self, **params):
+        try:
+            return self.pool.acquire(
+                partial(self.database.connect, **params),
+                self.is_usable if self.health_checks else None)
+        except PoolTimeout as error:
+            raise self.database.OperationalError(str(error)) from error
+
+    def is_usable(self, connection):
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT 1')
+        except self.database.Error:
+            return False
+        return True
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """PostgreSQL с пулом соединений внутри процесса.
+
+    Настройки пула — в ключе POOL: MAX_SIZE, TIMEOUT и MAX_AGE.
+    Соединение возвращается в пул в конце каждого запроса, поэтому
+    CONN_MAX_AGE для этого бэкенда не используется.
+    """
+
+    def __init__(self, settings_dict, alias=DEFAULT_DB_ALIAS):
+        super().__init__(settings_dict, alias)
+        options = settings_dict.get('POOL', {})
+        self.pool = get_pool(
+            alias,
+            max_size=options.get('MAX_SIZE', 10),
+            timeout=options.get('TIMEOUT', 5),
+            max_age=options.get('MAX_AGE'))
+        self.Database = PooledDatabase(
+            base.Database, self.pool, settings_dict['CONN_HEALTH_CHECKS'])
+
+    def connect(self):
+        super().connect()
+        self.close_at = time.monotonic()
+
+    def _close(self):
+        if self.connection is None:
+            return
+        # Соединение, закрытое внутри atomic, остаётся у этого потока до
+        # выхода из блока, поэтому в пул его возвращать нельзя.
+        discard = self.in_atomic_block or bool(self.connection.closed)
+        if not discard:
+            try:
+                # Вне транзакции rollback() не обращается к серверу.
+                self.connection.rollback()
+            except base.Database.Error:
+                discard = True
+        self.pool.release(self.connection, discard=discard)
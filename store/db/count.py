@@ -0,0 +1,34 @@
+import json
+
+from django.db import connections
+
+
+def _sqlite_table_rows(connection, table):
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE name = "
+                       "'sqlite_stat1'")
+        if cursor.fetchone() is None:
+            return None
+        # Первое число в stat — количество строк в таблице.
+        cursor.execute('SELECT stat FROM sqlite_stat1 WHERE tbl = %s '
+                       'LIMIT 1', [table])
+        row = cursor.fetchone()
+    return int(row[0].split()[0]) if row else None
+
+
+def estimate_count(queryset):
+    """Возвращает оценку количества строк запроса по статистике
+    планировщика или None, если оценки нет.
+
+    PostgreSQL оценивает любой запрос по EXPLAIN. SQLite — только всю
+    таблицу без условий и только после ANALYZE.
+    """
+    connection = connections[queryset.db]
+    if connection.vendor == 'postgresql':
+        plan = json.loads(queryset.order_by().explain(format='json'))
+        return int(plan[0]['Plan']['Plan Rows'])
+    query = queryset.query
+    if (connection.vendor == 'sqlite' and not query.where
+            and not query.is_sliced and not query.distinct):
+        return _sqlite_table_rows(connection, queryset.model._meta.db_table)
+    return None
@@ -0,0 +1,69 @@
+import json
+
+from django.db import connections
+
+# Узлы плана PostgreSQL, которых не должно быть в запросах API на большом
+# каталоге: полный проход таблицы и сортировка результата.
+POSTGRESQL_PROBLEM_NODES = ('Seq Scan', 'Sort', 'Incremental Sort')
+POSTGRESQL_INDEX_NODES = ('Index Scan', 'Index Only Scan')
+
+
+def _postgresql_problems(plan, index_scan_allowed):
+    problems = []
+    relation = plan.get('Relation Name')
+    if plan['Node Type'] in POSTGRESQL_PROBLEM_NODES:
+        problems.append(f'{plan["Node Type"]} on {relation}'
+                        if relation else plan['Node Type'])
+    elif (plan['Node Type'] in POSTGRESQL_INDEX_NODES
+            and 'Index Cond' not in plan and not index_scan_allowed):
+        # Проход всего индекса без условия — тот же полный проход
+        # таблицы, только в порядке индекса.
+        problems.append(f'{plan["Node Type"]} using {plan["Index Name"]} '
+                        f'on {relation} without Index Cond')
+    for subplan in plan.get('Plans', ()):
+        problems.extend(_postgresql_problems(subplan, index_scan_allowed))
+    return problems
+
+
+def _sqlite_problems(plan, index_scan_allowed):
+    problems = []
+    for line in plan.splitlines():
+        # Строки EXPLAIN QUERY PLAN: id, parent, notused, detail.
+        detail = line.split(' ', 3)[-1]
+        # SCAN (subquery-N) — проход по уже выбранным строкам подзапроса.
+        if detail.startswith('SCAN ') and not detail.startswith('SCAN ('):
+            # SCAN ... USING INDEX — проход всего индекса, а не поиск
+            # по нему (SEARCH).
+            if ' USING ' not in detail or not index_scan_allowed:
+                problems.append(detail)
+        elif detail.startswith('USE TEMP B-TREE'):
+            problems.append(detail)
+    return problems
+
+
+def _index_scan_allowed(queryset):
+    """Проход индекса по порядку допустим только для первой страницы без
+    условий: он останавливается после LIMIT строк. С OFFSET или условием
+    WHERE, которое не стало условием поиска по индексу, пройти придётся
+    сколько угодно строк."""
+    query = queryset.query
+    return (query.high_mark is not None and not query.low_mark
+            and not query.where)
+
+
+def explain(queryset):
+    """Возвращает план запроса и список найденных в нём полных проходов
+    таблиц и индексов и сортировок.
+
+    Поддерживаются PostgreSQL и SQLite; для других баз список пуст.
+    """
+    vendor = connections[queryset.db].vendor
+    index_scan_allowed = _index_scan_allowed(queryset)
+    if vendor == 'postgresql':
+        plan = queryset.explain(format='json')
+        return plan, _postgresql_problems(json.loads(plan)[0]['Plan'],
+                                          index_scan_allowed)
+    plan = queryset.explain()
+    if vendor == 'sqlite':
+        return plan, _sqlite_problems(plan, index_scan_allowed)
+    return plan, []
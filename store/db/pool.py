@@ -0,0 +1,128 @@
+import threading
+import time
+
+pools = {}
+pools_lock = threading.Lock()
+
+
+class PoolTimeout(Exception):
+    pass
+
+
+class ConnectionPool:
+    """Пул соединений с базой данных внутри процесса.
+
+    Соединения создаются по требованию, но не больше max_size
+    одновременно; если все заняты, запрос ждёт до timeout секунд.
+    Соединения живут не дольше max_age секунд с момента создания.
+    """
+
+    def __init__(self, max_size, timeout, max_age=None):
+        self.max_size = max_size
+        self.timeout = timeout
+        self.max_age = max_age
+        self._idle = []
+        self._created_at = {}
+        self._condition = threading.Condition()
+        self.active = 0
+        self.waiting = 0
+        self.waits = 0
+        self.wait_time = 0.0
+        self.max_wait_time = 0.0
+        self.timeouts = 0
+        self.created = 0
+        self.discarded = 0
+
+    def acquire(self, create, is_usable=None):
+        start = time.monotonic()
+        with self._condition:
+            if not self._idle and self.active >= self.max_size:
+                self.waiting += 1
+                try:
+                    while not self._idle and self.active >= self.max_size:
+                        remaining = self.timeout - (time.monotonic() - start)
+                        if remaining <= 0:
+                            self.timeouts += 1
+                            raise PoolTimeout(
+                                'Нет свободных соединений за '
+                                f'{self.timeout} с')
+                        self._condition.wait(remaining)
+                finally:
+                    self.waiting -= 1
+                waited = time.monotonic() - start
+                self.waits += 1
+                self.wait_time += waited
+                self.max_wait_time = max(self.max_wait_time, waited)
+            self.active += 1
+            idle = self._idle.pop() if self._idle else None
+        try:
+            if idle is not None and (self._expired(idle) or (
+                    is_usable is not None and not is_usable(idle))):
+                self._discard(idle)
+                idle = None
+            if idle is not None:
+                return idle
+            connection = create()
+        except BaseException:
+            with self._condition:
+                self.active -= 1
+                self._condition.notify()
+            raise
+        with self._condition:
+            self._created_at[connection] = time.monotonic()
+            self.created += 1
+        return connection
+
+    def release(self, connection, discard=False):
+        if discard or self._expired(connection):
+            self._discard(connection)
+            connection = None
+        with self._condition:
+            self.active -= 1
+            if connection is not None:
+                self._idle.append(connection)
+            self._condition.notify()
+
+    def _expired(self, connection):
+        if self.max_age is None:
+            return False
+        created_at = self._created_at.get(connection, 0)
+        return time.monotonic() - created_at >= self.max_age
+
+    def _discard(self, connection):
+        with self._condition:
+            self._created_at.pop(connection, None)
+            self.discarded += 1
+        try:
+            connection.close()
+        except Exception:
+            pass
+
+    def stats(self):
+        with self._condition:
+            return {
+                'max_size': self.max_size,
+                'active': self.active,
+                'idle': len(self._idle),
+                'waiting': self.waiting,
+                'waits': self.waits,
+                'wait_time_total': round(self.wait_time, 6),
+                'wait_time_max': round(self.max_wait_time, 6),
+                'wait_time_avg': round(self.wait_time / self.waits, 6)
+                if self.waits else 0.0,
+                'timeouts': self.timeouts,
+                'created': self.created,
+                'discarded': self.discarded,
+            }
+
+
+def get_pool(alias, **options):
+    with pools_lock:
+        if alias not in pools:
+            pools[alias] = ConnectionPool(**options)
+        return pools[alias]
+
+
+def get_pool_stats():
+    with pools_lock:
+        return {alias: pool.stats() for alias, pool in pools.items()}
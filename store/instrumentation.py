@@ -0,0 +1,232 @@
+import cProfile
+import heapq
+import io
+import itertools
+import json
+import logging
+import pstats
+import random
+import statistics
+import threading
+import time
+from collections import deque
+from contextvars import ContextVar
+from functools import wraps
+
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+logger = logging.getLogger('store.performance')
+
+# Метрики текущего запроса; выставляет InstrumentationMiddleware.
+# Переменная контекста переходит и в потоки sync_to_async, поэтому
+# запросы к базе из асинхронных представлений тоже учитываются.
+current_metrics = ContextVar('current_metrics', default=None)
+
+TIMINGS = ('db', 'serialize', 'render', 'thumbnails')
+
+
+class RequestMetrics:
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.duration = None
+        self.db_queries = 0
+        self.timings = dict.fromkeys(TIMINGS, 0.0)
+        self.active = set()
+
+    def stop(self):
+        self.duration = time.perf_counter() - self.start
+
+
+def timed(name):
+    """Добавляет время выполнения функции к метрике name текущего запроса.
+
+    Вложенные вызовы с той же метрикой не учитываются повторно.
+    """
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            metrics = current_metrics.get()
+            if metrics is None or name in metrics.active:
+                return func(*args, **kwargs)
+            metrics.active.add(name)
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                metrics.timings[name] += time.perf_counter() - start
+                metrics.active.discard(name)
+        return wrapper
+    return decorator
+
+
+def record_query(execute, sql, params, many, context):
+    metrics = current_metrics.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        metrics.timings['db'] += time.perf_counter() - start
+        metrics.db_queries += 1
+
+
+def add_query_recorder(connection, **kwargs):
+    # В начало списка: connection.execute_wrapper() снимает последнюю
+    # обёртку, а соединение может открыться внутри такого блока.
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, record_query)
+
+
+def install_query_recorder():
+    for connection in connections.all(initialized_only=True):
+        add_query_recorder(connection)
+    connection_created.connect(add_query_recorder,
+                               dispatch_uid='store.instrumentation')
+
+
+def start_profiler():
+    if random.random() >= settings.PERFORMANCE_PROFILE_SAMPLE_RATE:
+        return None
+    profiler = cProfile.Profile()
+    profiler.enable()
+    return profiler
+
+
+def get_route(request):
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return None
+    # Маршруты роутера DRF — регулярные выражения с ^ и $ по краям.
+    route = match.route.replace('/^', '/').removeprefix('^')
+    return '/' + route.replace('$/', '/').removesuffix('$')
+
+
+def format_profile(profiler):
+    stream = io.StringIO()
+    pstats.Stats(profiler, stream=stream).sort_stats(
+        'cumulative').print_stats(30)
+    return stream.getvalue()
+
+
+def milliseconds(seconds):
+    return round(seconds * 1000, 3)
+
+
+class RequestStats:
+    """Статистика запросов процесса по маршрутам и профили самых
+    медленных запросов из попавших в выборку."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counter = itertools.count()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.routes = {}
+            self.profiles = []
+
+    def add(self, key, metrics, status_code, profiler=None):
+        with self._lock:
+            route = self.routes.get(key)
+            if route is None:
+                route = self.routes[key] = {
+                    'count': 0, 'errors': 0, 'max': 0.0, 'total': 0.0,
+                    'db_queries': 0, **dict.fromkeys(TIMINGS, 0.0),
+                    'durations': deque(
+                        maxlen=settings.PERFORMANCE_STATS_WINDOW)}
+            route['count'] += 1
+            route['errors'] += status_code >= 500
+            route['max'] = max(route['max'], metrics.duration)
+            route['total'] += metrics.duration
+            route['db_queries'] += metrics.db_queries
+            for name, value in metrics.timings.items():
+                route[name] += value
+            route['durations'].append(metrics.duration)
+            if profiler is None:
+                return
+            keep = len(self.profiles) < settings.PERFORMANCE_PROFILE_KEEP
+            if not keep and metrics.duration <= self.profiles[0][0]:
+                return
+        # Текст профиля собирается без блокировки, он может быть долгим.
+        entry = (metrics.duration, next(self._counter),
+                 {'route': key, 'duration_ms': milliseconds(metrics.duration),
+                  'profile': format_profile(profiler)})
+        with self._lock:
+            if len(self.profiles) < settings.PERFORMANCE_PROFILE_KEEP:
+                heapq.heappush(self.profiles, entry)
+            else:
+                heapq.heappushpop(self.profiles, entry)
+
+    def get_stats(self):
+        with self._lock:
+            routes = {key: {**route, 'durations': list(route['durations'])}
+                      for key, route in self.routes.items()}
+            profiles = sorted(self.profiles, reverse=True)
+        result = {}
+        for key, route in sorted(routes.items()):
+            count = route['count']
+            durations = route['durations']
+            percentiles = (statistics.quantiles(durations, n=100)
+                           if len(durations) > 1 else durations * 99)
+            result[key] = {
+                'count': count,
+                'errors': route['errors'],
+                'avg_ms': milliseconds(route['total'] / count),
+                'p50_ms': milliseconds(percentiles[49]),
+                'p95_ms': milliseconds(percentiles[94]),
+                'p99_ms': milliseconds(percentiles[98]),
+                'max_ms': milliseconds(route['max']),
+                'db_queries_avg': round(route['db_queries'] / count, 2),
+                **{f'{name}_ms_avg': milliseconds(route[name] / count)
+                   for name in TIMINGS},
+            }
+        return {'routes': result,
+                'slowest_profiles': [entry for *_, entry in profiles]}
+
+
+request_stats = RequestStats()
+
+
+def server_timing(metrics):
+    parts = [f'total;dur={milliseconds(metrics.duration)}',
+             f'db;dur={milliseconds(metrics.timings["db"])};'
+             f'desc="{metrics.db_queries} queries"']
+    parts.extend(f'{name};dur={milliseconds(value)}'
+                 for name, value in metrics.timings.items()
+                 if name != 'db' and value)
+    return ', '.join(parts)
+
+
+def finish_request(request, response, metrics, profiler=None):
+    """Учитывает запрос в статистике, пишет строку лога и добавляет
+    заголовок Server-Timing.
+
+    Медленные запросы пишутся с уровнем WARNING, остальные — с INFO.
+    """
+    metrics.stop()
+    route = get_route(request)
+    key = f'{request.method} {route or "unresolved"}'
+    request_stats.add(key, metrics, response.status_code, profiler)
+    duration_ms = milliseconds(metrics.duration)
+    level = (logging.WARNING
+             if duration_ms >= settings.PERFORMANCE_SLOW_REQUEST_MS
+             else logging.INFO)
+    # Строка собирается, только если её уровень не отфильтрован.
+    if logger.isEnabledFor(level):
+        logger.log(level, json.dumps({
+            'method': request.method,
+            'path': request.path,
+            'route': route,
+            'status': response.status_code,
+            'duration_ms': duration_ms,
+            'db_queries': metrics.db_queries,
+            **{f'{name}_ms': milliseconds(value)
+               for name, value in metrics.timings.items()},
+            'profiled': profiler is not None,
+        }, ensure_ascii=False))
+    if settings.PERFORMANCE_SERVER_TIMING:
+        response['Server-Timing'] = server_timing(metrics)
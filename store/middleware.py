@@ -0,0 +1,112 @@
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.cache import caches
+
+from store.instrumentation import (RequestMetrics, current_metrics,
+                                   finish_request, install_query_recorder,
+                                   start_profiler)
+from store.routers import (CATALOG_PIN_KEY, get_client_pin_key,
+                           pin_to_primary, replica_reads)
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+
+class InstrumentationMiddleware:
+    """Замеряет время запроса, запросы к базе, сериализацию и миниатюры.
+
+    Результат уходит в заголовок Server-Timing, лог store.performance и
+    статистику api/stats/requests/. Доля PERFORMANCE_PROFILE_SAMPLE_RATE
+    синхронных запросов профилируется cProfile; в асинхронных запросах
+    профилировщик видел бы только поток цикла событий, поэтому их не
+    профилируем.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+        install_query_recorder()
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        metrics = RequestMetrics()
+        token = current_metrics.set(metrics)
+        profiler = start_profiler()
+        try:
+            response = self.get_response(request)
+        finally:
+            if profiler is not None:
+                profiler.disable()
+            current_metrics.reset(token)
+        finish_request(request, response, metrics, profiler)
+        return response
+
+    async def __acall__(self, request):
+        metrics = RequestMetrics()
+        token = current_metrics.set(metrics)
+        try:
+            response = await self.get_response(request)
+        finally:
+            current_metrics.reset(token)
+        finish_request(request, response, metrics)
+        return response
+
+
+class ReplicaStickinessMiddleware:
+    """Разрешает читать каталог с реплик только в безопасных запросах.
+
+    После успешного изменяющего запроса клиент (по токену или сессии)
+    на REPLICA_STICKY_SECONDS читает с основной базы и видит свои
+    изменения.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not settings.REPLICA_DATABASES:
+            return self.get_response(request)
+        pin_key = get_client_pin_key(request)
+        token = replica_reads.set(self.can_read_replica(
+            request, caches[settings.REPLICA_PIN_CACHE].get_many(
+                self.get_pin_keys(pin_key))))
+        try:
+            response = self.get_response(request)
+        finally:
+            replica_reads.reset(token)
+        self.process_response(request, response, pin_key)
+        return response
+
+    async def __acall__(self, request):
+        if not settings.REPLICA_DATABASES:
+            return await self.get_response(request)
+        pin_key = get_client_pin_key(request)
+        token = replica_reads.set(self.can_read_replica(
+            request, await caches[settings.REPLICA_PIN_CACHE].aget_many(
+                self.get_pin_keys(pin_key))))
+        try:
+            response = await self.get_response(request)
+        finally:
+            replica_reads.reset(token)
+        self.process_response(request, response, pin_key)
+        return response
+
+    def get_pin_keys(self, pin_key):
+        return [CATALOG_PIN_KEY] + ([pin_key] if pin_key else [])
+
+    def can_read_replica(self, request, pins):
+        return request.method in SAFE_METHODS and not pins
+
+    def process_response(self, request, response, pin_key):
+        if (pin_key and request.method not in SAFE_METHODS
+                and response.status_code < 400):
+            pin_to_primary(pin_key)
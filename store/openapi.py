@@ -0,0 +1,96 @@
+import os
+from hashlib import sha256
+
+from django.conf import settings
+from django.http import FileResponse, Http404
+from django.urls import reverse
+from django.utils.cache import patch_cache_control
+from drf_yasg import openapi
+from drf_yasg.codecs import OpenAPICodecJson
+from drf_yasg.renderers import ReDocRenderer
+from drf_yasg.views import get_schema_view
+from rest_framework import permissions
+
+INFO = openapi.Info(
+    title="Store API",
+    default_version='v1',
+    description="Документация для проекта Store",)
+# Файл с именем текущей собранной схемы.
+LATEST_FILE = 'latest'
+
+schema_view = get_schema_view(
+    INFO,
+    public=True,
+    permission_classes=(permissions.AllowAny,),
+)
+
+
+def generate_schema():
+    """Собирает схему API так же, как schema_view, но без запроса: без
+    host и schemes, поэтому ссылки в ней относительные."""
+    generator = schema_view.generator_class(INFO)
+    schema = generator.get_schema(request=None, public=True)
+    return OpenAPICodecJson(validators=[]).encode(schema)
+
+
+def get_schema_name(content):
+    return f'openapi.{sha256(content).hexdigest()[:12]}.json'
+
+
+def get_built_schema_name():
+    try:
+        with open(os.path.join(settings.OPENAPI_SCHEMA_ROOT,
+                               LATEST_FILE)) as file:
+            name = file.read().strip()
+    except FileNotFoundError:
+        return None
+    if not os.path.exists(os.path.join(settings.OPENAPI_SCHEMA_ROOT, name)):
+        return None
+    return name
+
+
+def write_schema(content):
+    """Записывает схему в файл с хешем содержимого в имени и делает его
+    текущим. Старые файлы не удаляются: их могут ещё запрашивать
+    открытые страницы документации."""
+    os.makedirs(settings.OPENAPI_SCHEMA_ROOT, exist_ok=True)
+    name = get_schema_name(content)
+    with open(os.path.join(settings.OPENAPI_SCHEMA_ROOT, name), 'wb') as file:
+        file.write(content)
+    latest = os.path.join(settings.OPENAPI_SCHEMA_ROOT, LATEST_FILE)
+    with open(latest + '.tmp', 'w') as file:
+        file.write(name)
+    os.replace(latest + '.tmp', latest)
+    return name
+
+
+class PrebuiltReDocRenderer(ReDocRenderer):
+    """ReDoc, загружающий собранную командой build_openapi_schema схему.
+
+    Если схема не собрана, ReDoc, как и раньше, запрашивает её у
+    redoc/?format=openapi, где она строится на каждый запрос.
+    """
+
+    def get_redoc_settings(self):
+        data = super().get_redoc_settings()
+        name = get_built_schema_name()
+        if name is not None:
+            data['url'] = reverse('schema-file', args=(name,))
+        return data
+
+
+redoc_view = schema_view.as_cached_view(
+    renderer_classes=(PrebuiltReDocRenderer, *schema_view.renderer_classes))
+
+
+def schema_file(request, name):
+    """Отдаёт собранную схему; имя меняется вместе с содержимым, поэтому
+    браузер может хранить файл сколько угодно."""
+    path = os.path.join(settings.OPENAPI_SCHEMA_ROOT, name)
+    if not os.path.exists(path):
+        raise Http404
+    response = FileResponse(open(path, 'rb'),
+                            content_type='application/json')
+    patch_cache_control(response, public=True, max_age=31536000,
+                        immutable=True)
+    return response
@@ -0,0 +1,60 @@
+import random
+from contextvars import ContextVar
+from hashlib import sha1
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS, connections
+
+# Разрешено ли читать каталог с реплик; выставляет
+# ReplicaStickinessMiddleware только для безопасных запросов.
+replica_reads = ContextVar('replica_reads', default=False)
+
+CATALOG_PIN_KEY = 'replica:pin:catalog'
+
+
+class ReplicaRouter:
+    """Читает каталог с реплик, всё остальное — с основной базы.
+
+    Корзина, пользователи, токены и очередь миниатюр всегда работают с
+    основной базой, как и любые запросы вне ReplicaStickinessMiddleware
+    и внутри транзакций.
+    """
+    catalog_models = {'products.category', 'products.subcategory',
+                      'products.product', 'products.productlisting'}
+
+    def db_for_read(self, model, **hints):
+        if (settings.REPLICA_DATABASES
+                and model._meta.label_lower in self.catalog_models
+                and replica_reads.get()
+                and not connections[DEFAULT_DB_ALIAS].in_atomic_block):
+            return random.choice(settings.REPLICA_DATABASES)
+        return DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == DEFAULT_DB_ALIAS
+
+
+def get_client_pin_key(request):
+    credentials = (request.META.get('HTTP_AUTHORIZATION')
+                   or request.COOKIES.get(settings.SESSION_COOKIE_NAME))
+    if not credentials:
+        return None
+    return f'replica:pin:{sha1(credentials.encode()).hexdigest()}'
+
+
+def pin_to_primary(key=CATALOG_PIN_KEY):
+    """На REPLICA_STICKY_SECONDS отправляет чтение на основную базу.
+
+    По умолчанию — для всех клиентов, чтобы после изменения каталога
+    его кеш не заполнился отстающими данными реплики.
+    """
+    if settings.REPLICA_DATABASES:
+        caches[settings.REPLICA_PIN_CACHE].set(
+            key, True, settings.REPLICA_STICKY_SECONDS)
@@ -40,7 +40,9 @@ INSTALLED_APPS = [
 USE_DJANGO_JQUERY = True
 
 MIDDLEWARE = [
+    'store.middleware.InstrumentationMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'store.middleware.ReplicaStickinessMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -71,8 +73,44 @@ WSGI_APPLICATION = 'store.wsgi.application'
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        'api.authentication.CachedTokenAuthentication',
     ],
+    'DEFAULT_RENDERER_CLASSES': [
+        'api.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+}
+
+AUTH_TOKEN_CACHE_SIZE = 10000
+AUTH_TOKEN_CACHE_TTL = int(os.getenv('AUTH_TOKEN_CACHE_TTL', default=60))
+
+CART_BATCH_MAX_OPERATIONS = 100
+
+# Замеры запросов (store.middleware.InstrumentationMiddleware).
+PERFORMANCE_SERVER_TIMING = os.getenv(
+    'PERFORMANCE_SERVER_TIMING', default='True') == 'True'
+PERFORMANCE_PROFILE_SAMPLE_RATE = float(os.getenv(
+    'PERFORMANCE_PROFILE_SAMPLE_RATE', default=0.01))
+PERFORMANCE_PROFILE_KEEP = 10
+# Запросы дольше этого пишутся в лог с уровнем WARNING, остальные — INFO.
+PERFORMANCE_SLOW_REQUEST_MS = float(os.getenv(
+    'PERFORMANCE_SLOW_REQUEST_MS', default=1000))
+PERFORMANCE_STATS_WINDOW = 1000
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'store.performance': {
+            'handlers': ['console'],
+            # INFO включает строку лога для каждого запроса.
+            'level': os.getenv('PERFORMANCE_LOG_LEVEL', default='WARNING'),
+            'propagate': False,
+        },
+    },
 }
 
 DJOSER = {
@@ -111,10 +149,61 @@ else:
             'USER': os.getenv('POSTGRES_USER', default='postgres'),
             'PASSWORD': os.getenv('POSTGRES_PASSWORD', default='abcd1234'),
             'HOST': os.getenv('DB_HOST', default='db'),
-            'PORT': os.getenv('DB_PORT', default='5432')
+            'PORT': os.getenv('DB_PORT', default='5432'),
+            'CONN_MAX_AGE': int(os.getenv('DB_CONN_MAX_AGE', default=60)),
+            'CONN_HEALTH_CHECKS': os.getenv(
+                'DB_CONN_HEALTH_CHECKS', default='True') == 'True',
+            # Используется бэкендом store.db.backends.postgresql_pool.
+            'POOL': {
+                'MAX_SIZE': int(os.getenv('DB_POOL_MAX_SIZE', default=10)),
+                'TIMEOUT': float(os.getenv('DB_POOL_TIMEOUT', default=5)),
+                'MAX_AGE': int(os.getenv('DB_POOL_MAX_AGE', default=600)),
+            },
         }
     }
 
+# Реплики только для чтения каталога: хосты (PostgreSQL) и/или имена баз
+# (например, файлы SQLite), остальные параметры берутся у default.
+REPLICA_HOSTS = [host for host in os.getenv(
+    'DB_REPLICA_HOSTS', default='').split(',') if host]
+REPLICA_NAMES = [name for name in os.getenv(
+    'DB_REPLICA_NAMES', default='').split(',') if name]
+REPLICA_DATABASES = []
+for number in range(max(len(REPLICA_HOSTS), len(REPLICA_NAMES))):
+    alias = f'replica_{number}'
+    DATABASES[alias] = {
+        **DATABASES['default'],
+        'TEST': {'MIRROR': 'default'},
+    }
+    if number < len(REPLICA_HOSTS):
+        DATABASES[alias]['HOST'] = REPLICA_HOSTS[number]
+    if number < len(REPLICA_NAMES):
+        DATABASES[alias]['NAME'] = REPLICA_NAMES[number]
+    REPLICA_DATABASES.append(alias)
+DATABASE_ROUTERS = ['store.routers.ReplicaRouter']
+REPLICA_STICKY_SECONDS = int(os.getenv('DB_REPLICA_STICKY_SECONDS',
+                                       default=5))
+REPLICA_PIN_CACHE = 'catalog'
+
+# Подкатегории для выбора в админке (products.chaining).
+CHAINING_CACHE = 'catalog'
+CHAINING_CACHE_MAX_AGE = int(os.getenv('CHAINING_CACHE_MAX_AGE', default=60))
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'catalog': {
+        'BACKEND': os.getenv(
+            'CATALOG_CACHE_BACKEND',
+            default='django.core.cache.backends.db.DatabaseCache'),
+        'LOCATION': os.getenv('CATALOG_CACHE_LOCATION',
+                              default='catalog_cache'),
+        'TIMEOUT': int(os.getenv('CATALOG_CACHE_TIMEOUT', default=86400)),
+        'OPTIONS': {'MAX_ENTRIES': 10000},
+    },
+}
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
@@ -143,7 +232,13 @@ USE_TZ = True
 MEDIA_URL = 'media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+IMAGE_VARIANT_SIZES = ('128x128', '256x256', '512x512')
+THUMBNAIL_JOB_MAX_ATTEMPTS = 3
+THUMBNAIL_JOB_TIMEOUT = 600
+
 STATIC_URL = 'static/'
 STATIC_ROOT = os.path.join(BASE_DIR, 'static')
+# Схема API, собранная командой build_openapi_schema.
+OPENAPI_SCHEMA_ROOT = os.path.join(STATIC_ROOT, 'openapi')
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
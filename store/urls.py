@@ -2,25 +2,21 @@ from django.conf import settings
 from django.conf.urls.static import static
 from django.contrib import admin
 from django.urls import include, path, re_path
-from drf_yasg import openapi
-from drf_yasg.views import get_schema_view
-from rest_framework import permissions
 
-schema_view = get_schema_view(
-    openapi.Info(
-        title="Store API",
-        default_version='v1',
-        description="Документация для проекта Store",),
-    public=True,
-    permission_classes=(permissions.AllowAny,),
-)
+from products.chaining import chained_subcategories
+from store.openapi import redoc_view, schema_file
 
 urlpatterns = [
     path('for_staff_only/', admin.site.urls),
+    # Подкатегории для Product.subcategory — из кеша, остальное — как есть.
+    re_path(r'^chaining/filter/products/Subcategory/category/products/'
+            r'Product/subcategory/(?P<value>[\w\-,]+)/$',
+            chained_subcategories),
     re_path(r'^chaining/', include('smart_selects.urls')),
     path('api/', include('api.urls')),
-    re_path(r'^redoc/$', schema_view.with_ui('redoc', cache_timeout=0),
-            name='schema-redoc'),
+    re_path(r'^redoc/$', redoc_view, name='schema-redoc'),
+    re_path(r'^redoc/(?P<name>openapi\.[0-9a-f]{12}\.json)$', schema_file,
+            name='schema-file'),
 ]
 
 if settings.DEBUG: